@@ -7,3 +7,5 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'display_name', 'is_approved', 'points_total', 'stars_total')
     search_fields = ('user__username', 'display_name')
     list_filter = ('is_approved',)
+    # Totals follow the points ledger; change them through the member edit page (adjust_points)
+    readonly_fields = ('points_total', 'stars_total')
@@ -0,0 +1,69 @@
+# File: accounts/middleware.py
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+def member_cache_key(user_id):
+    return f'accounts:member:{user_id}'
+
+
+def _forget(user_ids):
+    cache.delete_many([member_cache_key(uid) for uid in user_ids])
+
+
+def forget_members(*user_ids):
+    """
+    Drop cached users (and their profiles) so the next request reloads them.
+    Inside a transaction they are dropped again on commit, so a request that
+    cached the old rows meanwhile cannot keep them for MEMBER_CACHE_TIMEOUT.
+    """
+    if not user_ids:
+        return
+    _forget(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _forget(user_ids))
+
+
+def get_cached_user(request):
+    """
+    auth.get_user() backed by the cache: the User with its Profile attached is
+    stored per user id, so an authenticated request resolves identity and
+    approval status without touching the database. The session auth hash is
+    still verified on every request; anything unusual defers to Django.
+    """
+    if hasattr(request, '_cached_user'):
+        return request._cached_user
+
+    user = None
+    user_id = request.session.get(auth.SESSION_KEY)
+    backend = request.session.get(auth.BACKEND_SESSION_KEY)
+    if user_id is not None and backend in settings.AUTHENTICATION_BACKENDS:
+        user_id = get_user_model()._meta.pk.to_python(user_id)
+        key = member_cache_key(user_id)
+        user = cache.get(key)
+        if user is not None:
+            session_hash = request.session.get(auth.HASH_SESSION_KEY)
+            if not session_hash or not constant_time_compare(session_hash, user.get_session_auth_hash()):
+                user = None  # let Django handle fallback secrets / flushing
+        if user is None:
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                getattr(user, 'profile', None)  # load once; pickled along with the user
+                cache.set(key, user, settings.MEMBER_CACHE_TIMEOUT)
+
+    request._cached_user = user or auth.get_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that resolves request.user through the member cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
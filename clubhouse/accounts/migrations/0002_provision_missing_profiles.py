@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.conf import settings
+from django.db import migrations
+
+
+def provision_missing_profiles(apps, schema_editor):
+    # The post_save signal now only provisions new users; backfill anyone
+    # who slipped through (e.g. bulk-created accounts)
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('accounts', 'Profile')
+    missing = User.objects.filter(profile__isnull=True)
+    Profile.objects.bulk_create(
+        [Profile(user=u, display_name=(f'{u.first_name} {u.last_name}'.strip() or u.username).strip())
+         for u in missing.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(provision_missing_profiles, migrations.RunPython.noop),
+    ]
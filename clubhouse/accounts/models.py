@@ -1,9 +1,12 @@
 # File: accounts/models.py
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from core import fragments
+from .middleware import forget_members
+
 def avatar_path(instance, filename):
     return f'avatars/user_{instance.user_id}/{filename}'
 
@@ -18,13 +21,40 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+def default_display_name(user):
+    return (user.get_full_name() or user.username).strip()
+
+def provision_profiles(users):
+    """
+    Create the missing Profiles for `users` in one query. User.objects.bulk_create()
+    sends no post_save, so call this right after bulk-creating users.
+    """
+    Profile.objects.bulk_create(
+        [Profile(user=u, display_name=default_display_name(u)) for u in users],
+        ignore_conflicts=True,
+    )
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    # Only a brand-new User needs a Profile; later saves (logins updating
+    # last_login, admin edits) must not touch the profile table at all
+    if created:
+        instance.profile = Profile.objects.create(user=instance, display_name=default_display_name(instance))
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_cached_member(sender, instance, **kwargs):
+    # Requests resolve user + profile from the cache; drop the stale copy
+    forget_members(instance.pk if sender is User else instance.user_id)
+
 @receiver(post_save, sender=User)
-def create_or_update_profile(sender, instance, created, **kwargs):
-    # Ensure a Profile exists for this User on every save (including login which updates last_login)
-    profile, created_profile = Profile.objects.get_or_create(user=instance)
-    # Initialize a friendly display name on first creation
-    if created_profile and not profile.display_name:
-        dn = (instance.get_full_name() or instance.username).strip()
-        if dn:
-            profile.display_name = dn
-            profile.save(update_fields=['display_name'])
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_member_fragments(sender, instance, update_fields=None, **kwargs):
+    # A login only touches last_login, which no fragment shows
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    fragments.invalidate(f'member:{instance.pk if sender is User else instance.user_id}', 'members', 'leaderboard')
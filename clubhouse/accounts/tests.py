@@ -1,3 +1,100 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from tasksapp.services import adjust_points
+from .middleware import member_cache_key
+from .models import Profile, provision_profiles
+
+
+class MemberCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='sam')
+        self.user.set_password('pw-12345')
+        self.user.save()
+        self.user.profile.is_approved = True
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_warm_request_skips_user_profile_and_session_queries(self):
+        url = reverse('tasksapp:history')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        tables = ('FROM "auth_user"', 'FROM "accounts_profile"', 'FROM "django_session"')
+        self.assertEqual([q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)], [])
+        self.assertEqual(len(ctx), 1)  # just the history page itself
+
+    def test_profile_save_invalidates_approval(self):
+        url = reverse('tasksapp:history')
+        self.client.get(url)
+        self.user.profile.is_approved = False
+        self.user.profile.save()
+        self.assertRedirects(self.client.get(url), reverse('accounts:pending'))
+
+    def test_password_change_still_ends_the_session(self):
+        self.client.get(reverse('tasksapp:history'))
+        User.objects.filter(pk=self.user.pk).update(password='changed-elsewhere')
+        cached = cache.get(member_cache_key(self.user.pk))
+        cached.password = 'changed-elsewhere'
+        cache.set(member_cache_key(self.user.pk), cached)
+        response = self.client.get(reverse('tasksapp:history'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('accounts:login'), response['Location'])
+
+    def test_ledger_writes_invalidate(self):
+        self.client.get(reverse('tasksapp:history'))
+        self.assertIsNotNone(cache.get(member_cache_key(self.user.pk)))
+        with self.captureOnCommitCallbacks() as callbacks:
+            adjust_points(self.user, points=5)
+            self.assertIsNone(cache.get(member_cache_key(self.user.pk)))
+            # Another request re-caches the profile before the ledger write commits
+            self.client.get(reverse('tasksapp:history'))
+            self.assertIsNotNone(cache.get(member_cache_key(self.user.pk)))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(member_cache_key(self.user.pk)))
+
+
+class ProfileAdminTests(TestCase):
+    def test_totals_cannot_be_edited_past_the_ledger(self):
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        member = User.objects.create(username='sam')
+        self.client.force_login(admin)
+        url = reverse('admin:accounts_profile_change', args=[member.profile.pk])
+        response = self.client.post(url, {'user': member.pk, 'display_name': 'Sam', 'is_approved': 'on',
+                                          'points_total': 99, 'stars_total': 9})
+        self.assertEqual(response.status_code, 302)
+        member.profile.refresh_from_db()
+        self.assertEqual((member.profile.display_name, member.profile.points_total, member.profile.stars_total),
+                         ('Sam', 0, 0))
+
+
+class ProfileProvisioningTests(TestCase):
+    def test_new_user_gets_profile(self):
+        user = User.objects.create(username='new', first_name='New', last_name='Member')
+        self.assertEqual(Profile.objects.get(user=user).display_name, 'New Member')
+
+    def test_login_does_not_touch_profiles(self):
+        user = User.objects.create(username='sam')
+        user.set_password('pw-12345')
+        user.save()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('accounts:login'), {'username': 'sam', 'password': 'pw-12345'})
+        self.assertEqual(response.status_code, 302)
+        sql = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual([q for q in sql if 'accounts_profile' in q], [])
+        # user lookup, session exists-check + insert, last_login update, session save
+        self.assertEqual(len(sql), 5)
+
+    def test_bulk_created_users_are_provisioned_in_one_query(self):
+        users = User.objects.bulk_create([User(username=f'bulk{i}') for i in range(20)])
+        with self.assertNumQueries(1):
+            provision_profiles(users)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 20)
@@ -21,7 +21,7 @@ def signup(request):
     if request.method == 'POST':
         form = SignupForm(request.POST)
         if form.is_valid():
-            settings = SiteSetting.get_solo()
+            settings = SiteSetting.get_cached()
             join_code_input = form.cleaned_data.get('join_code', '').strip()
 
             # If a join code is configured, require it and validate
@@ -53,14 +53,15 @@ def signup(request):
                     'first_name': form.cleaned_data.get('first_name'),
                     'last_name': form.cleaned_data.get('last_name'),
                 }
-                user = User.objects.create(is_active=True, **allowed)
+                user = User(is_active=True, **allowed)
                 user.set_password(password)
-                user.save()
+                user.save()  # post_save creates the Profile
 
                 # Approval gating (always pending until admin approves)
-                prof = user.profile  # created by post_save signal in accounts.models
-                prof.is_approved = False
-                prof.save()
+                prof = user.profile
+                if prof.is_approved:
+                    prof.is_approved = False
+                    prof.save(update_fields=['is_approved'])
 
             messages.info(request, 'Signup successful. Awaiting admin approval.')
             return redirect('accounts:pending')
@@ -14,3 +14,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clubhouse.settings')
 
 application = get_asgi_application()
+
+# Live update streams are answered ahead of Django's handler (see core.events)
+from core.events import with_event_stream  # noqa: E402
+
+application = with_event_stream(application)
+
+# Optional in-process overdue sweeper (see OVERDUE_SWEEP_INTERVAL in settings)
+from tasksapp.sweeper import start_sweeper_from_settings  # noqa: E402
+
+start_sweeper_from_settings()
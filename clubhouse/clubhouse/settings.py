@@ -47,11 +47,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',  # no-op unless REQUEST_TIMING is on
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',  # staff only: ?_profile=1 or X-Profile header
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +91,34 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (DATABASE_PROFILE=production). WAL lets readers
+# carry on while a writer commits; busy_timeout makes a blocked writer wait
+# instead of failing with "database is locked"; IMMEDIATE transactions take
+# the write lock at BEGIN, so an atomic block that reads and then writes
+# cannot deadlock when upgrading its lock. Each worker thread keeps its
+# connection for DB_CONN_MAX_AGE seconds (use 0 under ASGI, where request
+# threads do not live long enough to reuse one).
+# `python manage.py db_load_test` compares this profile with the stock one.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # fsync at checkpoints; WAL stays consistent
+    'cache_size': -64000,  # KiB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # ms
+}
+SQLITE_PRODUCTION = {
+    'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
+    },
+}
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default')
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,3 +174,103 @@ LOGOUT_REDIRECT_URL = 'accounts:login'
 # File upload limits (avatars up to 2 MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
 FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+
+# Cache: local memory by default. With several worker processes point this at a
+# shared backend (FileBasedCache, Redis, ...) so invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'clubhouse'),
+    },
+    # Rendered cards and leaderboards plus the data version stamps behind them
+    # and the board ETags (core.fragments). With several workers a shared
+    # backend (FileBasedCache, Redis, ...) is a correctness requirement, not
+    # an optimisation: only then do all workers see every invalidation
+    'fragments': {
+        'BACKEND': os.environ.get('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'clubhouse-fragments'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 3600
+# With the default local-memory backend each worker keeps its own fragments
+# and stamps and misses the others' invalidations, so a card, a leaderboard or
+# a 304 Not Modified may be up to this many seconds stale there
+FRAGMENT_LOCAL_MAX_AGE = int(os.environ.get('FRAGMENT_LOCAL_MAX_AGE', '10'))
+
+# Seconds between live refreshes of the home and "my" boards (0 turns polling
+# off). Unchanged boards answer 304 Not Modified without touching the database
+BOARD_POLL_INTERVAL = int(os.environ.get('BOARD_POLL_INTERVAL', '30'))
+
+# Live updates over Server-Sent Events (core.views.events) instead of polling.
+# Needs an ASGI server; EVENTS_BACKEND = 'core.events.RedisBackend' (with
+# EVENTS_REDIS_URL) shares events between several workers
+SSE_ENABLED = os.environ.get('SSE_ENABLED', '0') == '1'
+SSE_KEEPALIVE = 15  # seconds between comment lines on an idle stream
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'core.events.LocalBackend')
+EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+
+# SiteSetting is served from process memory: revalidated against the shared
+# version stamp every CHECK_INTERVAL seconds, reloaded after MAX_AGE regardless
+SITE_SETTINGS_CHECK_INTERVAL = 2
+SITE_SETTINGS_MAX_AGE = 60
+
+# Late penalties: seconds between in-process overdue sweeps (0 disables; then
+# schedule `python manage.py sweep_overdue` instead)
+OVERDUE_SWEEP_INTERVAL = int(os.environ.get('OVERDUE_SWEEP_INTERVAL', '60'))
+
+# Sessions: cached_db reads sessions from the cache and only falls back to the
+# database on a miss. Set DJANGO_SESSION_ENGINE to
+# django.contrib.sessions.backends.signed_cookies to skip storage entirely.
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Seconds an authenticated user (with profile) stays in the cache; saves to
+# User/Profile and ledger writes invalidate it earlier
+MEMBER_CACHE_TIMEOUT = 300
+
+# Request instrumentation: Server-Timing headers plus a slow request / slow SQL
+# log (rotating file). Off by default; set REQUEST_TIMING=1 to enable.
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING', '0') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_SQL_MS = int(os.environ.get('SLOW_SQL_MS', '100'))
+SLOW_LOG_FILE = os.environ.get('SLOW_LOG_FILE', str(BASE_DIR / 'slow.log'))
+
+# On-demand profiling: staff add ?_profile=1 (or an X-Profile header) to any
+# request; cProfile output lands in PROFILES_DIR, listed under the admin panel
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '1') == '1'
+PROFILES_DIR = os.environ.get('PROFILES_DIR', str(BASE_DIR / 'profiles'))
+PROFILES_KEEP = 50
+
+# Prometheus-format metrics at /core/metrics, readable by staff or with
+# `Authorization: Bearer $METRICS_TOKEN`. With METRICS_DIR set, each worker
+# writes its totals there (at most every METRICS_FLUSH_INTERVAL seconds) and
+# the endpoint sums them; without it each process reports only its own.
+# Files are named by host and PID, and a scrape only folds away the files of
+# its own host's exited processes, so a directory shared across containers
+# stays correct but needs each host to be scraped to stay small.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 10
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {'format': '%(asctime)s %(levelname)s %(message)s'},
+    },
+    'handlers': {
+        'slow_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_LOG_FILE,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,  # no file until something is slow
+            'formatter': 'timestamped',
+        },
+    },
+    'loggers': {
+        'clubhouse.slow': {'handlers': ['slow_file'], 'level': 'WARNING', 'propagate': False},
+    },
+}
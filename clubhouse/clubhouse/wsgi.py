@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clubhouse.settings')
 
 application = get_wsgi_application()
+
+# Optional in-process overdue sweeper (see OVERDUE_SWEEP_INTERVAL in settings)
+from tasksapp.sweeper import start_sweeper_from_settings  # noqa: E402
+
+start_sweeper_from_settings()
@@ -0,0 +1,268 @@
+# File: core/benchmarks.py
+import asyncio
+import platform
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+
+import django
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment, teardown_test_environment)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.datasets import DATASET_PREFIX, generate_dataset
+from elections.models import Election
+from tasksapp.models import Assignment, monday_of_week
+from tasksapp.pagination import KeysetPaginator
+from tasksapp.selectors import BOARD_ORDERING, board_cards
+from tasksapp.views import BOARD_PAGE_SIZE, BOARD_SECTIONS
+
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+    'fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-fragments'},
+}
+
+
+class _Fixture:
+    """Clients and target rows shared by the scenarios of one dataset size."""
+
+    def __init__(self):
+        self.leader = User.objects.get(username=f'{DATASET_PREFIX}-leader')
+        self.member = User.objects.filter(username__startswith=DATASET_PREFIX, is_staff=False) \
+            .order_by('username').first()
+        self.leader_client = Client()
+        self.leader_client.force_login(self.leader)
+        self.member_client = Client()
+        self.member_client.force_login(self.member)
+        self.submitted = Assignment.objects.filter(status=Assignment.STATUS_SUBMITTED).order_by('-pk').first()
+        self.election = Election.objects.filter(end_at__gt=timezone.now()).order_by('start_at').first()
+
+
+def _home(f):
+    f.leader_client.get(reverse('tasksapp:home'))
+
+
+def _section(name, now, week_start):
+    """First page of one home board section, as the home view builds it; returns its query count."""
+    with CaptureQueriesContext(connection) as ctx:
+        KeysetPaginator(board_cards(name, now, week_start), BOARD_ORDERING[name], per_page=BOARD_PAGE_SIZE).page()
+    return len(ctx)
+
+
+def _home_sections(f):
+    now, week_start = timezone.now(), monday_of_week(date.today())
+    for name in BOARD_SECTIONS:
+        _section(name, now, week_start)
+
+
+# The home view builds its sections one after another. home_sections_gathered
+# is the async engine that was tried instead: the same sections gathered side
+# by side on a bounded pool, each worker with its own connection (Django's
+# async ORM would run them one at a time on a single thread). It lost on
+# SQLite, where the page is mostly rendering and reads hardly overlap under
+# the GIL; re-run both on another database before reviving it
+_pool = None
+
+
+def _gather_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=len(BOARD_SECTIONS), thread_name_prefix='bench-section')
+    return _pool
+
+
+def _close_gather_pool():
+    """Close every worker's connections, then the pool; the test database is dropped next."""
+    global _pool
+    if _pool is None:
+        return
+    workers = len(BOARD_SECTIONS)
+    barrier = threading.Barrier(workers)  # holds each task on its own thread
+
+    def close():
+        barrier.wait()
+        connections.close_all()
+
+    for future in [_pool.submit(close) for _ in range(workers)]:
+        future.result()
+    _pool.shutdown()
+    _pool = None
+
+
+async def _gather_sections(now, week_start):
+    section = sync_to_async(_section, thread_sensitive=False, executor=_gather_pool())
+    return await asyncio.gather(*(section(name, now, week_start) for name in BOARD_SECTIONS))
+
+
+def _home_sections_gathered(f):
+    # Queries run on the workers' connections, so they are counted there
+    return sum(async_to_sync(_gather_sections)(timezone.now(), monday_of_week(date.today())))
+
+
+def _history(f):
+    f.leader_client.get(reverse('tasksapp:history'))
+
+
+def _members(f):
+    f.leader_client.get(reverse('core:members'))
+
+
+def _approve(f):
+    f.leader_client.post(reverse('tasksapp:assignment_approve', args=[f.submitted.pk]), HTTP_HX_REQUEST='true')
+
+
+def _vote(f):
+    f.member_client.post(reverse('elections:vote', args=[f.election.pk]), {'candidate': f.leader.pk})
+
+
+def _rollover(f):
+    call_command('rollover_assignments', stdout=StringIO())
+
+
+def _close_elections(f):
+    call_command('close_ended_elections', stdout=StringIO())
+
+
+# name -> (callable, writes); writing scenarios run inside a rolled-back
+# transaction so every iteration sees the same data
+SCENARIOS = {
+    'home': (_home, False),
+    'home_sections': (_home_sections, False),
+    'home_sections_gathered': (_home_sections_gathered, False),
+    'history': (_history, False),
+    'members': (_members, False),
+    'assignment_approve': (_approve, True),
+    'vote': (_vote, True),
+    'rollover_assignments': (_rollover, True),
+    'close_ended_elections': (_close_elections, True),
+}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def _run_once(func, fixture, writes):
+    # A scenario may return the queries it ran on other threads' connections
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        if writes:
+            with transaction.atomic():
+                elsewhere = func(fixture)
+                transaction.set_rollback(True)
+        else:
+            elsewhere = func(fixture)
+        elapsed = time.perf_counter() - started
+    return elapsed, len(ctx) + (elsewhere or 0)
+
+
+def measure(name, fixture, iterations, warmup=2):
+    """Latency percentiles (ms), query count and peak traced memory for one scenario."""
+    func, writes = SCENARIOS[name]
+    for _ in range(warmup):
+        _run_once(func, fixture, writes)
+    timings, queries = [], []
+    for _ in range(iterations):
+        elapsed, count = _run_once(func, fixture, writes)
+        timings.append(elapsed * 1000)
+        queries.append(count)
+    # Memory is traced on a separate run; tracing slows everything down
+    tracemalloc.start()
+    try:
+        _run_once(func, fixture, writes)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(sizes, weeks=8, iterations=20, scenarios=None, seed=1, log=None):
+    """
+    Benchmark each scenario against every dataset size; returns a JSON-serializable report.
+
+    Runs in a throwaway test database (flushed between sizes) with a private
+    locmem cache, so the real database and cache are never touched.
+    """
+    scenarios = scenarios or list(SCENARIOS)
+    report = {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'weeks': weeks,
+            'seed': seed,
+        },
+        'sizes': {},
+    }
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(CACHES=BENCH_CACHES, OVERDUE_SWEEP_INTERVAL=0):
+            for i, size in enumerate(sizes):
+                if i:
+                    call_command('flush', interactive=False, verbosity=0)
+                cache.clear()
+                started = time.perf_counter()
+                dataset = generate_dataset(members=size, weeks=weeks, seed=seed)
+                if log:
+                    log(f"{size} members: generated {dict(dataset)} in {time.perf_counter() - started:.1f}s")
+                fixture = _Fixture()
+                results = {}
+                for name in scenarios:
+                    results[name] = measure(name, fixture, iterations)
+                    if log:
+                        r = results[name]
+                        log(f"  {name:<22} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms"
+                            f"  {r['queries']:>5} queries")
+                report['sizes'][str(size)] = {'dataset': dict(dataset), 'scenarios': results}
+    finally:
+        _close_gather_pool()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return report
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Rows comparing `report` with `baseline` for every size/scenario both contain.
+
+    A row regresses when p50 grows by more than `tolerance` (a fraction) or the
+    query count grows at all.
+    """
+    rows = []
+    for size, data in report['sizes'].items():
+        base_size = baseline.get('sizes', {}).get(size)
+        if not base_size:
+            continue
+        for name, now in data['scenarios'].items():
+            before = base_size['scenarios'].get(name)
+            if not before:
+                continue
+            ratio = now['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1.0
+            rows.append({
+                'size': size, 'scenario': name,
+                'p50_ms': now['p50_ms'], 'baseline_p50_ms': before['p50_ms'], 'ratio': round(ratio, 3),
+                'queries': now['queries'], 'baseline_queries': before['queries'],
+                'regressed': ratio > 1 + tolerance or now['queries'] > before['queries'],
+            })
+    return rows
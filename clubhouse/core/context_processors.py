@@ -2,4 +2,4 @@
 from .models import SiteSetting
 
 def site_settings(request):
-    return {'SITE': SiteSetting.get_solo()}
+    return {'SITE': SiteSetting.get_cached()}
@@ -0,0 +1,139 @@
+# File: core/datasets.py
+import random
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounts.models import Profile, provision_profiles
+from core import fragments
+from core.models import SiteSetting
+from elections.models import Election, Vote, VoteTally
+from tasksapp.models import (Assignment, PointsEvent, Task, monday_of_week,
+                             POINTS_APPROVED, POINTS_LATE_PENALTY, POINTS_PER_STAR)
+from tasksapp.services import rebuild_weekly_scores
+
+DATASET_PREFIX = 'bench'
+BATCH_SIZE = 1000
+
+
+def _aware(d, hour):
+    return timezone.make_aware(datetime.combine(d, time(hour)))
+
+
+@transaction.atomic
+def generate_dataset(members=50, weeks=8, tasks_per_week=5, seed=1):
+    """
+    Fill the current database with a synthetic clubhouse; returns row counts.
+
+    Everything is written with bulk_create: `members` approved members plus a
+    leader, `weeks` weeks of tasks ending this week, each member assigned to
+    every task (past work mostly approved with stars, the rest submitted,
+    overdue or penalized), the matching ledger and weekly rollup, monthly
+    elections with votes, and one election open right now. The most recent
+    ended election is left unfinalized. The same seed always gives the same data.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    this_week = monday_of_week(timezone.localdate())
+    stats = Counter()
+    unusable = make_password(None)
+
+    User.objects.bulk_create(
+        [User(username=f'{DATASET_PREFIX}-leader', password=unusable, is_staff=True, is_superuser=True)] +
+        [User(username=f'{DATASET_PREFIX}{i:05d}', first_name=f'Member {i}', password=unusable)
+         for i in range(members)],
+        batch_size=BATCH_SIZE,
+    )
+    users = list(User.objects.filter(username__startswith=DATASET_PREFIX).order_by('username'))
+    provision_profiles(users)
+    Profile.objects.filter(user__in=users).update(is_approved=True)
+    leader = next(u for u in users if u.username == f'{DATASET_PREFIX}-leader')
+    site = SiteSetting.get_solo()
+    site.current_leader = leader
+    site.save()
+    stats['users'] = len(users)
+
+    week_starts = [this_week - timedelta(weeks=w) for w in range(weeks - 1, -1, -1)]
+    Task.objects.bulk_create(
+        [Task(title=f'Chore {w:%Y-%m-%d} #{n}', description='Generated for benchmarks',
+              week_start=w, due_at=_aware(w + timedelta(days=4), 18), created_by=leader)
+         for w in week_starts for n in range(tasks_per_week)],
+        batch_size=BATCH_SIZE,
+    )
+    tasks = list(Task.objects.filter(created_by=leader, week_start__in=week_starts).order_by('pk'))
+    stats['tasks'] = len(tasks)
+
+    assignments = []
+    for task in tasks:
+        past = task.due_at < now
+        for user in users:
+            a = Assignment(task=task, assignee=user, due_at=task.due_at)
+            roll = rng.random()
+            if roll < (0.7 if past else 0.3):
+                a.status = Assignment.STATUS_APPROVED
+                a.stars_awarded = rng.choice((0, 0, 0, 1, 2))
+                a.points_awarded = POINTS_APPROVED + a.stars_awarded * POINTS_PER_STAR
+                a.submitted_at = task.due_at - timedelta(hours=rng.randint(2, 72))
+                a.approved_at = a.submitted_at + timedelta(hours=1)
+                a.approved_by = leader
+            elif roll < (0.8 if past else 0.6):
+                a.status = Assignment.STATUS_SUBMITTED
+                a.submitted_at = task.due_at - timedelta(hours=rng.randint(2, 72))
+            else:
+                a.late_penalized = past and rng.random() < 0.5
+            assignments.append(a)
+    Assignment.objects.bulk_create(assignments, batch_size=BATCH_SIZE)
+    stats['assignments'] = len(assignments)
+
+    events = []
+    generated = Assignment.objects.filter(task__created_by=leader, task__week_start__in=week_starts)
+    for a in generated.filter(Q(status=Assignment.STATUS_APPROVED) | Q(late_penalized=True)).select_related('task'):
+        if a.status == Assignment.STATUS_APPROVED:
+            events.append(PointsEvent(user_id=a.assignee_id, kind=PointsEvent.KIND_APPROVAL,
+                                      points=a.points_awarded, stars=a.stars_awarded, assignment=a,
+                                      created_by=leader, created_at=a.approved_at,
+                                      week_start=a.task.week_start))
+        else:
+            events.append(PointsEvent(user_id=a.assignee_id, kind=PointsEvent.KIND_LATE_PENALTY,
+                                      points=POINTS_LATE_PENALTY, assignment=a, created_at=a.due_at,
+                                      week_start=a.task.week_start))
+    PointsEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    stats['points_events'] = len(events)
+    totals = {uid: Profile(pk=pk, points_total=0, stars_total=0)
+              for uid, pk in Profile.objects.filter(user__in=users).values_list('user_id', 'pk')}
+    for e in events:
+        totals[e.user_id].points_total += e.points
+        totals[e.user_id].stars_total += e.stars
+    Profile.objects.bulk_update(totals.values(), ['points_total', 'stars_total'], batch_size=BATCH_SIZE)
+    stats['weekly_scores'] = rebuild_weekly_scores()
+
+    # Monthly elections across the generated range, plus one open now
+    election_ends = [_aware(w + timedelta(days=6), 20) for w in week_starts[::4]]
+    elections = [Election(start_at=end - timedelta(days=1), end_at=end, created_by=leader)
+                 for end in election_ends if end < now]
+    elections.append(Election(start_at=now - timedelta(hours=1), end_at=now + timedelta(days=1), created_by=leader))
+    Election.objects.bulk_create(elections)
+    elections = list(Election.objects.filter(created_by=leader).order_by('end_at'))
+    candidates = rng.sample(users, min(len(users), 5))
+    Vote.objects.bulk_create(
+        [Vote(election=e, voter=u, candidate=rng.choice(candidates))
+         for e in elections for u in users if rng.random() < 0.6],
+        batch_size=BATCH_SIZE,
+    )
+    VoteTally.objects.bulk_create(
+        [VoteTally(election_id=row['election_id'], candidate_id=row['candidate_id'], votes=row['votes'])
+         for row in (Vote.objects.filter(election__in=elections)
+                     .values('election_id', 'candidate_id').annotate(votes=Count('id')))],
+    )
+    for e in elections[:-2]:
+        e.finalize_and_set_leader()
+    stats['elections'] = len(elections)
+    stats['votes'] = Vote.objects.filter(election__created_by=leader).count()
+    # Bulk inserts send no signals, so cached cards could match reused ids
+    fragments.invalidate_all()
+    return stats
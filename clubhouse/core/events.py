@@ -0,0 +1,249 @@
+# File: core/events.py
+"""
+Live change events for Server-Sent Events streams (core.views.events).
+
+Invalidated fragment tags (core.fragments) are the change feed: once the
+write commits, 'assignment:<id>' goes out as event 'a-<id>' and
+'leaderboard' as 'leaderboard'. Events travel through EVENTS_BACKEND, so
+with a shared backend every worker hears every write, and each worker's
+Hub fans them out to its open streams. A stream holds no thread: it is an
+asyncio task waiting on an Event, and pending names are merged into a set,
+so a slow client gets one event per changed card rather than a backlog.
+
+Under ASGI, wrap the application with with_event_stream() so streams are
+served ahead of Django's handler. A Django view keeps a thread per request
+for as long as its response streams, which is the cost this avoids.
+"""
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from functools import cache
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from accounts.middleware import get_cached_user
+
+logger = logging.getLogger(__name__)
+
+
+def event_names(tags):
+    """SSE event names for invalidated fragment tags; other tags are not streamed."""
+    names = set()
+    for tag in tags:
+        if tag.startswith('assignment:'):
+            names.add('a-' + tag.removeprefix('assignment:'))
+        elif tag == 'leaderboard':
+            names.add('leaderboard')
+    return names
+
+
+class Subscription:
+    """One open stream: the names changed since it last woke up."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = set()
+        self.wakeup = asyncio.Event()
+
+    def push(self, names):
+        # Runs on the stream's own event loop (see Hub.deliver)
+        self.pending |= names
+        self.wakeup.set()
+
+    async def next(self, timeout):
+        """Names changed since the last call; empty after `timeout` seconds of quiet."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return set()
+        self.wakeup.clear()
+        names, self.pending = self.pending, set()
+        return names
+
+
+class Hub:
+    """Fans event names out to this process's open streams, from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def deliver(self, names):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, set(names))
+            except RuntimeError:
+                self.unsubscribe(subscription)  # its loop has shut down
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    """Events stay in this process: enough for a single ASGI worker."""
+
+    def publish(self, names):
+        hub.deliver(names)
+
+    def start(self):
+        pass
+
+
+class RedisBackend:
+    """Redis pub/sub shared by every worker; needs the `redis` package and EVENTS_REDIS_URL."""
+
+    channel = 'clubhouse:events'
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBackend needs the 'redis' package installed.") from None
+        self.redis = redis
+        self.client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self._listener = None
+
+    def publish(self, names):
+        self.client.publish(self.channel, json.dumps(sorted(names)))
+
+    def start(self):
+        # One listener thread per process, started with the first stream
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    hub.deliver(set(json.loads(message['data'])))
+            except self.redis.ConnectionError:
+                logger.warning("events: lost the Redis connection, reconnecting")
+                time.sleep(1)
+
+
+@cache
+def backend():
+    return import_string(settings.EVENTS_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'EVENTS_BACKEND':
+        backend.cache_clear()
+
+
+def announce(tags):
+    """Publish the events for `tags`; called by core.fragments once a change is committed."""
+    names = event_names(tags)
+    if not names:
+        return
+    try:
+        backend().publish(names)
+    except Exception:
+        # The write has committed; a lost event must not fail the request
+        logger.exception("events: could not publish %s", sorted(names))
+
+
+async def event_stream():
+    """SSE body: a retry hint, then changed names as they arrive, with keepalive comments."""
+    subscription = hub.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            names = await subscription.next(settings.SSE_KEEPALIVE)
+            if not names:
+                yield ': keepalive\n\n'  # keeps proxies from closing an idle stream
+                continue
+            yield ''.join(f'event: {name}\ndata: {name}\n\n' for name in sorted(names))
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def is_approved_member(request):
+    """Session user check for streams; runs on a pooled thread, so close what it opened."""
+    try:
+        if not hasattr(request, 'session'):
+            engine = import_module(settings.SESSION_ENGINE)
+            request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = get_cached_user(request)
+        profile = getattr(user, 'profile', None) if user.is_authenticated else None
+        return bool(profile and profile.is_approved)
+    finally:
+        close_old_connections()
+
+
+STREAM_HEADERS = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                  (b'x-accel-buffering', b'no')]  # nginx: pass events through unbuffered
+
+
+async def asgi_event_stream(scope, receive, send):
+    """The event stream as a bare ASGI app: no middleware, no thread once it is open."""
+    message = await receive()  # GET: the (empty) request body
+    request = ASGIRequest(scope, io.BytesIO())
+    # thread_sensitive=False: a pooled thread for the check, not one kept for the stream
+    if message['type'] == 'http.disconnect' or \
+            not await sync_to_async(is_approved_member, thread_sensitive=False)(request):
+        await send({'type': 'http.response.start', 'status': 403,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': b'Live updates are for approved members.'})
+        return
+    backend().start()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+
+    async def pump():
+        async for chunk in event_stream():
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(disconnected())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def with_event_stream(application):
+    """ASGI application that serves the core:events URL itself and passes everything else on."""
+    path = reverse('core:events')
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == path and scope['method'] == 'GET':
+            return await asgi_event_stream(scope, receive, send)
+        return await application(scope, receive, send)
+    return app
+
@@ -0,0 +1,107 @@
+# File: core/fragments.py
+"""
+Tagged fragment cache for rendered HTML.
+
+A fragment's key combines its name, the current version stamp of each of
+its tags (e.g. 'assignment:12', 'leaderboard') and any vary-on values.
+Invalidating a tag just writes a new stamp, so every fragment carrying it
+misses on its next render and old entries expire on their own. Stamps and
+fragments live in the FRAGMENT_CACHE_ALIAS cache, which can be local
+memory, files or a shared cache; hits and misses are counted in
+core.metrics.
+
+A local-memory cache never hears about other workers' invalidations, so
+there fragments and stamps are kept for at most FRAGMENT_LOCAL_MAX_AGE
+seconds: an expired stamp is replaced by a new one, which also changes
+every ETag built from it (tasksapp.views._page_etag).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from core import events, metrics
+
+VERSION_PREFIX = 'frag:v:'
+GENERATION_TAG = '*'  # on every fragment; invalidate_all() bumps it
+_MISSING = object()
+
+
+def _cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def _timeout(timeout):
+    """`timeout`, capped at FRAGMENT_LOCAL_MAX_AGE when the cache is process-local."""
+    if not isinstance(_cache(), LocMemCache):
+        return timeout
+    max_age = settings.FRAGMENT_LOCAL_MAX_AGE
+    return max_age if timeout is None else min(timeout, max_age)
+
+
+def versions(tags):
+    """Current stamp of each tag, creating stamps for tags never seen before."""
+    keys = [VERSION_PREFIX + tag for tag in tags]
+    found = _cache().get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, _timeout(None))
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def _bump(tags):
+    stamp = time.time_ns()
+    _cache().set_many({VERSION_PREFIX + tag: stamp for tag in tags}, _timeout(None))
+
+
+def invalidate(*tags):
+    """
+    Give each tag a new stamp; fragments tagged with any of them re-render.
+    Inside a transaction the tags are bumped again on commit, so a render that
+    read the old rows meanwhile cannot stay cached under the new stamp. Live
+    streams hear about the change (core.events) once it is committed.
+    """
+    if not tags:
+        return
+    _bump(tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: (_bump(tags), events.announce(tags)))
+    else:
+        events.announce(tags)
+
+
+def invalidate_all():
+    """Drop every fragment, e.g. after bulk writes that send no signals."""
+    invalidate(GENERATION_TAG)
+
+
+def digest(tags, vary=()):
+    """Hash of the current stamps of `tags` plus the vary-on values."""
+    tags = [GENERATION_TAG, *tags]
+    parts = [f'{tag}={stamp}' for tag, stamp in zip(tags, versions(tags))] + [repr(v) for v in vary]
+    return hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def fragment_key(name, tags, vary=()):
+    return f'frag:{name}:{digest(tags, vary)}'
+
+
+def get_or_set(name, tags, vary, compute, valid=None):
+    """
+    Cached value of fragment `name` (usually rendered HTML), or the result of
+    compute(), which is then stored. `valid(value)` returning False forces a
+    recompute for values that go stale by themselves, such as a deadline.
+    """
+    key = fragment_key(name, tags, vary)
+    value = _cache().get(key, _MISSING)
+    if value is not _MISSING and (valid is None or valid(value)):
+        metrics.FRAGMENT_CACHE.inc(fragment=name, result='hit')
+        return value
+    metrics.FRAGMENT_CACHE.inc(fragment=name, result='miss')
+    value = compute()
+    _cache().set(key, value, _timeout(settings.FRAGMENT_CACHE_TIMEOUT))
+    return value
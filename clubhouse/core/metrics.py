@@ -0,0 +1,332 @@
+# File: core/metrics.py
+"""
+Minimal Prometheus-style metrics: counters and histograms in process memory,
+rendered in the text exposition format by core.views.metrics.
+
+With METRICS_DIR set, every process periodically writes its totals to
+<METRICS_DIR>/<host>-<pid>-<start>.json (atomic replace; a failed write is
+logged, never raised into the request that triggered it) and the endpoint
+sums all files, so the numbers cover every worker. Counters are cumulative,
+so the files of exited processes (short-lived management commands included)
+are folded into archive.json on scrape rather than dropped. Whether a
+process has exited can only be told from its own host (PID namespace), so a
+scrape folds only that host's files; with a directory shared between hosts
+or containers, files of hosts that never serve a scrape stay in place (still
+counted, just not compacted). Without METRICS_DIR each process reports only
+its own numbers.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # one writer per process; threads all share its file
+_last_flush = 0.0
+_process_file = None
+# <host>-<pid>-<start>.json; files without a host predate it and count as this host's
+_WORKER_FILE = re.compile(r'^(?:(?P<host>.+)-)?(?P<pid>\d+)-\d+\.json$')
+_HOST = re.sub(r'[^\w.]+', '_', socket.gethostname()) or 'localhost'
+ARCHIVE_FILE = 'archive.json'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _maybe_flush()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            slots = self.values.get(key)
+            if slots is None:
+                slots = self.values[key] = [0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    slots[i] += 1
+                    break
+            else:
+                slots[len(self.buckets)] += 1  # +Inf
+            slots[-2] += value
+            slots[-1] += 1
+        _maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _process_filename():
+    global _process_file
+    if _process_file is None:
+        _process_file = f'{_HOST}-{os.getpid()}-{time.time_ns()}.json'
+    return _process_file
+
+
+def _after_fork():
+    # A forked worker starts from zero under its own file; the parent keeps its counts
+    global _lock, _flush_lock, _process_file, _last_flush
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _process_file = None
+    _last_flush = 0.0
+    for metric in _registry.values():
+        metric.values = {}
+
+
+if hasattr(os, 'register_at_fork'):  # POSIX; there is no fork on Windows
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _snapshot():
+    with _lock:
+        # Histogram slots are copied so they can be read outside the lock
+        return {name: [[list(key), list(value) if isinstance(value, list) else value]
+                       for key, value in m.values.items()]
+                for name, m in _registry.items()}
+
+
+def _write_json(path, data):
+    """Replace `path` atomically, going through a temp file of its own."""
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix='.tmp', delete=False) as fh:
+        try:
+            json.dump(data, fh)
+        except BaseException:
+            fh.close()
+            os.remove(fh.name)
+            raise
+    try:
+        os.replace(fh.name, path)
+    except OSError:
+        os.remove(fh.name)
+        raise
+
+
+def flush():
+    """
+    Write this process's totals to METRICS_DIR (no-op without one). Runs
+    inside Counter.inc() and friends, so errors are logged, not raised.
+    """
+    global _last_flush
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    with _flush_lock:
+        _last_flush = time.monotonic()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_json(os.path.join(directory, _process_filename()), _snapshot())
+        except OSError:
+            logger.exception("Could not write metrics to %s", directory)
+
+
+def _maybe_flush():
+    if settings.METRICS_DIR and time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+atexit.register(lambda: settings.configured and flush())
+
+
+def _merge(sources, names):
+    totals = {name: {} for name in names}
+    for source in sources:
+        for name, rows in source.items():
+            if name not in totals:
+                continue
+            for key, value in rows:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = totals[name].get(key, [0] * len(value))
+                    totals[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    totals[name][key] = totals[name].get(key, 0) + value
+    return totals
+
+
+def _load(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}  # removed meanwhile, or never written
+
+
+def _alive(pid):
+    if os.name == 'nt':
+        return _alive_windows(pid)  # os.kill() would terminate the process there
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _alive_windows(pid):
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return False
+    try:
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        return code.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+@contextmanager
+def _locked(directory):
+    """Exclusive lock on <directory>/.lock, across processes."""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file closes
+            yield
+            return
+        msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _exited(match):
+    # Only this host's PIDs mean anything here
+    return match['host'] in (None, _HOST) and not _alive(int(match['pid']))
+
+
+def _compact(directory):
+    """Fold the files of this host's exited processes into archive.json so the directory stays small."""
+    with _locked(directory):
+        dead = [entry.path for entry in os.scandir(directory)
+                if (m := _WORKER_FILE.match(entry.name)) and _exited(m)]
+        if not dead:
+            return
+        archive = os.path.join(directory, ARCHIVE_FILE)
+        sources = [_load(archive)] + [_load(path) for path in dead]
+        names = {name for source in sources for name in source}
+        merged = {name: [[list(key), value] for key, value in rows.items()]
+                  for name, rows in _merge(sources, names).items()}
+        _write_json(archive, merged)
+        for path in dead:
+            os.remove(path)
+
+
+def _collect():
+    """Totals for every metric, summed across worker files when METRICS_DIR is set."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return _merge([_snapshot()], _registry)
+    flush()
+    _compact(directory)
+    paths = [entry.path for entry in os.scandir(directory)
+             if entry.name == ARCHIVE_FILE or _WORKER_FILE.match(entry.name)]
+    return _merge([_load(path) for path in paths], _registry)
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_text():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, values in _collect().items():
+        metric = _registry[name]
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(values.items()):
+            if metric.kind == 'counter':
+                lines.append(f'{name}{_labels(metric.labelnames, key)} {_number(value)}')
+                continue
+            running = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value):
+                running += count
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, key, [("le", bound)])} {running}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, key)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, key)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---- Clubhouse metrics ----
+REQUEST_LATENCY = Histogram('clubhouse_request_duration_seconds', 'Request latency by view.', ['view'])
+REQUEST_QUERIES = Histogram('clubhouse_request_queries', 'Database queries per request by view.', ['view'],
+                            buckets=(1, 2, 5, 10, 20, 50, 100, 250))
+APPROVALS = Counter('clubhouse_approvals_total', 'Assignments approved.')
+STARS = Counter('clubhouse_stars_total', 'Stars awarded.')
+LATE_PENALTIES = Counter('clubhouse_late_penalties_total', 'Late penalties applied.')
+VOTES = Counter('clubhouse_votes_total', 'Votes cast or changed.')
+ROLLOVER_BATCH = Histogram('clubhouse_rollover_batch_size', 'Assignments per rollover chunk.',
+                           buckets=(1, 10, 50, 100, 250, 500, 1000, 5000))
+FRAGMENT_CACHE = Counter('clubhouse_fragment_cache_total', 'Fragment cache lookups by fragment and result.',
+                         ['fragment', 'result'])
+COMMAND_DURATION = Histogram('clubhouse_command_duration_seconds', 'Management command run time.', ['command'],
+                             buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900))
+
+
+@contextmanager
+def command_timer(command):
+    """Time a management command and write the result out right away (commands exit soon after)."""
+    try:
+        with COMMAND_DURATION.time(command=command):
+            yield
+    finally:
+        flush()
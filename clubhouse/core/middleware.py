@@ -0,0 +1,253 @@
+# File: core/middleware.py
+import cProfile
+import logging
+import os
+import re
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+
+from core import metrics
+
+logger = logging.getLogger('clubhouse.slow')
+
+_active = ContextVar('request_timing', default=None)
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """Collapse literals and IN lists so identical statements group together in logs."""
+    sql = _LITERALS.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LISTS.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def query_budget(limit):
+    """
+    Declare how many queries a view may run. Put it above the other decorators.
+    Requests over budget are logged by RequestTimingMiddleware, and tests can
+    enforce the budget with core.testing.QueryBudgetMixin.
+    """
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class _RequestTiming:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.view = 0.0
+        self.view_started = None
+        self.view_name = None
+        self.budget = None
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db += elapsed
+            if elapsed * 1000 >= settings.SLOW_SQL_MS:
+                logger.warning("slow sql %.1fms view=%s sql=%s", elapsed * 1000, self.view_name, normalize_sql(sql))
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    timing = _active.get()
+    if timing is None:
+        return _original_render(self, context)
+    # Includes render nested templates; only the outermost one is counted
+    timing._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        timing._template_depth -= 1
+        if not timing._template_depth:
+            timing.template += time.perf_counter() - started
+
+
+class RequestTimingMiddleware:
+    """
+    Per-request query count, DB, template, view and total time, sent back as a
+    Server-Timing header (on HTMX fragments too). Requests slower than
+    SLOW_REQUEST_MS, statements slower than SLOW_SQL_MS and views over their
+    declared query_budget are logged to the 'clubhouse.slow' logger.
+    Enabled with the REQUEST_TIMING setting.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed()
+        Template.render = _timed_render
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = _RequestTiming()
+        token = _active.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timing))
+                request._request_timing = timing
+                response = self.get_response(request)
+        finally:
+            _active.reset(token)
+        finished = time.perf_counter()
+        total = finished - started
+        if timing.view_started is not None:
+            timing.view = finished - timing.view_started
+
+        response['Server-Timing'] = timing.server_timing(total)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning("slow request %.1fms %s %s view=%s queries=%d db=%.1fms tpl=%.1fms",
+                           total * 1000, request.method, request.path, timing.view_name,
+                           timing.queries, timing.db * 1000, timing.template * 1000)
+        if timing.budget is not None and timing.queries > timing.budget:
+            logger.warning("query budget exceeded %s view=%s queries=%d budget=%d",
+                           request.path, timing.view_name, timing.queries, timing.budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = request._request_timing
+        timing.view_name = f'{view_func.__module__}.{getattr(view_func, "__qualname__", view_func.__class__.__name__)}'
+        timing.budget = getattr(view_func, 'query_budget', None)
+        timing.view_started = time.perf_counter()
+        return None
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Record latency and query count of every request, labelled with the URL
+    name of its view, in core.metrics. Disabled with METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, view=view)
+        metrics.REQUEST_QUERIES.observe(counter.count, view=view)
+        return response
+
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ON = {'1', 'true', 'yes', 'on'}
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+
+
+def list_profiles():
+    """Saved profiles as (name, size, modified) tuples, newest first."""
+    try:
+        entries = [e for e in os.scandir(settings.PROFILES_DIR) if e.is_file() and PROFILE_NAME.match(e.name)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [(e.name, e.stat().st_size, e.stat().st_mtime) for e in entries]
+
+
+def profile_path(name):
+    """Absolute path of a saved profile, or None for names that are not ours."""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(settings.PROFILES_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilerMiddleware:
+    """
+    Wrap a single request in cProfile when a staff member asks for it with
+    ?_profile=1 or an `X-Profile: 1` header. The profile is saved to
+    PROFILES_DIR as <timestamp>-<view>-<user>.prof, its name is returned in the
+    X-Profile response header, and the newest PROFILES_KEEP files are kept.
+    Untriggered requests pay only the trigger check. Needs request.user, so it
+    sits after the authentication middleware. Disabled with PROFILER_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._requested(request):
+            return self.get_response(request)
+        if not (request.user.is_staff or request.user.is_superuser):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        response[PROFILE_HEADER] = self._save(request, profiler)
+        return response
+
+    @staticmethod
+    def _requested(request):
+        # Only an explicit yes: `X-Profile: 0` or ?_profile=false means no
+        values = (request.GET.get(PROFILE_PARAM), request.headers.get(PROFILE_HEADER))
+        return any(v is not None and v.strip().lower() in PROFILE_ON for v in values)
+
+    def _save(self, request, profiler):
+        match = request.resolver_match
+        view = re.sub(r'[^\w.-]+', '-', match.view_name if match else request.path).strip('-') or 'root'
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+        user = re.sub(r'[^\w.-]+', '-', request.user.get_username())
+        name = f'{stamp}-{view}-{user}.prof'
+        os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(settings.PROFILES_DIR, name))
+        for old, _, _ in list_profiles()[settings.PROFILES_KEEP:]:
+            try:
+                os.remove(os.path.join(settings.PROFILES_DIR, old))
+            except FileNotFoundError:
+                pass
+        return name
@@ -1,7 +1,25 @@
 # File: core/models.py
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 
+from . import fragments
+
+# Shared version stamp; every worker compares it with its in-memory copy
+SITE_SETTINGS_VERSION_KEY = 'core:site-settings:version'
+
+_SiteEntry = namedtuple('_SiteEntry', 'obj version loaded_at checked_at')
+_site_entry = None
+_site_lock = threading.Lock()
+
 class SiteSetting(models.Model):
     """Singleton settings row."""
     join_code = models.CharField(max_length=32, blank=True, default='')
@@ -20,3 +38,54 @@ class SiteSetting(models.Model):
     def get_solo(cls):
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
+
+    @classmethod
+    def get_cached(cls):
+        """
+        Read-only singleton served from process memory (do not mutate or save it).
+
+        The copy is revalidated against a shared version stamp at most every
+        SITE_SETTINGS_CHECK_INTERVAL seconds and reloaded after
+        SITE_SETTINGS_MAX_AGE seconds regardless, so a change made on one
+        worker reaches every other worker within a bounded time.
+        """
+        global _site_entry
+        now = time.monotonic()
+        entry = _site_entry
+        if entry and now - entry.checked_at < settings.SITE_SETTINGS_CHECK_INTERVAL:
+            return entry.obj
+
+        version = cache.get(SITE_SETTINGS_VERSION_KEY)
+        if entry and version is not None and version == entry.version \
+                and now - entry.loaded_at < settings.SITE_SETTINGS_MAX_AGE:
+            _site_entry = entry._replace(checked_at=now)
+            return entry.obj
+
+        with _site_lock:
+            if version is None:
+                cache.add(SITE_SETTINGS_VERSION_KEY, time.time_ns(), None)
+                version = cache.get(SITE_SETTINGS_VERSION_KEY)
+            obj, created = cls.objects.select_related('current_leader').get_or_create(pk=1)
+            if created:
+                # Creating the row bumped the stamp through post_save
+                version = cache.get(SITE_SETTINGS_VERSION_KEY)
+            _site_entry = _SiteEntry(obj, version, now, now)
+        return obj
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop this process's copy and tell other workers to reload theirs."""
+        global _site_entry
+        _site_entry = None
+        cache.set(SITE_SETTINGS_VERSION_KEY, time.time_ns(), None)
+
+@receiver(post_save, sender=SiteSetting)
+def invalidate_site_settings(sender, **kwargs):
+    SiteSetting.clear_cache()
+    fragments.invalidate('site')
+
+@receiver(setting_changed)
+def reset_site_settings_cache(setting, **kwargs):
+    # Tests that override settings start from a fresh copy
+    global _site_entry
+    _site_entry = None
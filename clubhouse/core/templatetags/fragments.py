@@ -0,0 +1,52 @@
+# File: core/templatetags/fragments.py
+from django import template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from core.fragments import get_or_set
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, tags, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.tags = tags
+        self.vary = vary
+
+    def render(self, context):
+        vary = [v.resolve(context) for v in self.vary]
+        html = get_or_set(self.name.resolve(context), self.tags.resolve(context) or (), vary,
+                          lambda: self.nodelist.render(context))
+        return mark_safe(html)
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    {% cachefragment "name" tags [vary ...] %}...{% endcachefragment %}
+
+    Renders the body once per combination of tag versions and vary-on values
+    (see core.fragments); `tags` is a list such as Assignment.cache_tags.
+    Anything the body shows that is not covered by a tag must be a vary value.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a tag list")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    name, tags, *vary = [parser.compile_filter(bit) for bit in bits[1:]]
+    return FragmentNode(nodelist, name, tags, vary)
+
+
+@register.filter
+def eq(value, other):
+    """value == other, for vary-on values: {{ a.assignee_id|eq:request.user.id }}"""
+    return value == other
+
+
+@register.filter
+def past(value):
+    """True once a datetime is in the past."""
+    return value is not None and value < timezone.now()
@@ -0,0 +1,32 @@
+# File: core/testing.py
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+def counted_queries(ctx):
+    """SQL from a CaptureQueriesContext, minus the savepoints TestCase wraps around atomic blocks."""
+    return [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: request a URL and fail if its view runs more queries than
+    it declared with @core.middleware.query_budget. Warm up the session and
+    caches with one request first; budgets describe the steady state.
+    """
+
+    def assertWithinQueryBudget(self, url, method='get', data=None, **extra):
+        view = resolve(urlsplit(url).path).func
+        budget = getattr(view, 'query_budget', None)
+        if budget is None:
+            self.fail(f"{view.__module__}.{view.__name__} declares no @query_budget")
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, **extra)
+        sql = counted_queries(ctx)
+        if len(sql) > budget:
+            listing = '\n'.join(f'  {i}. {q}' for i, q in enumerate(sql, 1))
+            self.fail(f"{view.__name__} ran {len(sql)} queries, budget is {budget}:\n{listing}")
+        return response
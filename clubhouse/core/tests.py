@@ -1,3 +1,464 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from elections.models import Election
+from tasksapp.models import Assignment, Task, monday_of_week
+from tasksapp.services import reconcile_profile_totals
+from . import events, fragments, metrics
+from .benchmarks import compare
+from .middleware import normalize_sql
+from .testing import QueryBudgetMixin
+from .datasets import generate_dataset
+from .models import SiteSetting, SITE_SETTINGS_VERSION_KEY
+
+
+class SiteSettingCacheTests(TestCase):
+    def setUp(self):
+        SiteSetting.clear_cache()
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.admin.profile.is_approved = True
+        self.admin.profile.save()
+
+    def tearDown(self):
+        # The in-memory copy outlives the test transaction
+        SiteSetting.clear_cache()
+
+    def site_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return [q['sql'] for q in ctx.captured_queries if 'core_sitesetting' in q['sql']]
+
+    def test_hot_path_does_not_query_settings(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('tasksapp:home'))
+        self.assertEqual(self.site_queries(lambda: self.client.get(reverse('tasksapp:home'))), [])
+
+    def test_save_reloads_immediately(self):
+        SiteSetting.get_cached()
+        settings = SiteSetting.get_solo()
+        settings.current_leader = self.admin
+        settings.save()
+        self.assertEqual(SiteSetting.get_cached().current_leader, self.admin)
+
+    def test_version_bump_from_another_worker_is_picked_up(self):
+        with self.settings(SITE_SETTINGS_CHECK_INTERVAL=0):
+            SiteSetting.get_cached()
+            SiteSetting.objects.filter(pk=1).update(join_code='NEWCODE')
+            self.assertEqual(SiteSetting.get_cached().join_code, '')
+            cache.set(SITE_SETTINGS_VERSION_KEY, time.time_ns(), None)
+            self.assertEqual(SiteSetting.get_cached().join_code, 'NEWCODE')
+
+
+class BenchmarkDatasetTests(TestCase):
+    def tearDown(self):
+        SiteSetting.clear_cache()
+
+    def test_generated_dataset_is_consistent(self):
+        stats = generate_dataset(members=6, weeks=3, tasks_per_week=2)
+        self.assertEqual(stats['users'], 7)
+        self.assertEqual(stats['assignments'], 7 * 3 * 2)
+        self.assertEqual(reconcile_profile_totals(), [])
+        statuses = set(Assignment.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, {Assignment.STATUS_ASSIGNED, Assignment.STATUS_SUBMITTED,
+                                    Assignment.STATUS_APPROVED})
+        self.assertTrue(Election.objects.filter(end_at__gt=timezone.now()).exists())
+
+    def test_compare_flags_slower_or_chattier_runs(self):
+        base = {'sizes': {'50': {'scenarios': {'home': {'p50_ms': 10.0, 'queries': 7},
+                                               'vote': {'p50_ms': 5.0, 'queries': 11}}}}}
+        now = {'sizes': {'50': {'scenarios': {'home': {'p50_ms': 11.0, 'queries': 8},
+                                              'vote': {'p50_ms': 7.0, 'queries': 11}}}}}
+        rows = {r['scenario']: r['regressed'] for r in compare(now, base, tolerance=0.2)}
+        self.assertEqual(rows, {'home': True, 'vote': True})
+        rows = {r['scenario']: r['regressed'] for r in compare(base, base)}
+        self.assertEqual(rows, {'home': False, 'vote': False})
+
+
+class SqliteProfileTests(TestCase):
+    def test_production_profile_tunes_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profile = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3'),
+                                       **settings.SQLITE_PRODUCTION}, alias='profile')
+            try:
+                with profile.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous', 'temp_store', 'busy_timeout'):
+                        pragmas[name] = cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'temp_store': 2,
+                                           'busy_timeout': 5000})
+                self.assertEqual(profile.transaction_mode, 'IMMEDIATE')  # write lock taken at BEGIN
+            finally:
+                profile.close()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every view with a @query_budget stays within it on a small generated dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(members=8, weeks=2, tasks_per_week=2)
+        cls.leader = User.objects.get(username='bench-leader')
+        cls.member = User.objects.get(username='bench00000')
+        cls.election = Election.objects.filter(end_at__gt=timezone.now()).first()
+
+    def setUp(self):
+        cache.clear()
+        SiteSetting.clear_cache()
+
+    def tearDown(self):
+        cache.clear()
+        SiteSetting.clear_cache()
+
+    def warm(self, user, url):
+        self.client.force_login(user)
+        self.client.get(url)
+
+    def test_read_views(self):
+        for name in ('tasksapp:home', 'tasksapp:history', 'tasksapp:weekly', 'tasksapp:leaderboard',
+                     'core:members'):
+            with self.subTest(name):
+                self.warm(self.leader, reverse(name))
+                self.assertWithinQueryBudget(reverse(name))
+        for section in ('assigned', 'submitted', 'approved', 'overdue'):
+            with self.subTest(section):
+                self.assertWithinQueryBudget(reverse('tasksapp:board_section', args=[section]))
+                self.assertWithinQueryBudget(reverse('tasksapp:my_section', args=[section]))
+        for name in ('tasksapp:my_assignments', 'tasksapp:review'):
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(name))
+
+    def test_card_endpoints(self):
+        due = timezone.now() + timedelta(days=1)
+        task = Task.objects.create(title='Fresh', week_start=monday_of_week(due.date()), due_at=due,
+                                   created_by=self.leader)
+        mine = Assignment.objects.create(task=task, assignee=self.member)
+        self.warm(self.member, reverse('tasksapp:history'))
+        self.assertWithinQueryBudget(reverse('tasksapp:assignment_submit', args=[mine.pk]), method='post',
+                                     HTTP_HX_REQUEST='true')
+        submitted = Assignment.objects.filter(status=Assignment.STATUS_SUBMITTED).first()
+        self.warm(self.leader, reverse('tasksapp:history'))
+        for name in ('tasksapp:assignment_star', 'tasksapp:assignment_approve'):
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(name, args=[submitted.pk]), method='post',
+                                             HTTP_HX_REQUEST='true')
+        queue = list(Assignment.objects.filter(status=Assignment.STATUS_SUBMITTED).values_list('pk', flat=True))
+        for action in ('star', 'approve'):
+            with self.subTest(action):
+                self.assertWithinQueryBudget(reverse('tasksapp:assignment_bulk'), method='post',
+                                             data={'action': action, 'ids': queue}, HTTP_HX_REQUEST='true')
+
+    def test_election_views(self):
+        self.warm(self.member, reverse('elections:current'))
+        self.assertWithinQueryBudget(reverse('elections:current'))
+        self.assertWithinQueryBudget(reverse('elections:vote', args=[self.election.pk]), method='post',
+                                     data={'candidate': self.leader.pk})
+        self.assertWithinQueryBudget(reverse('elections:results', args=[self.election.pk]))
+
+
+@override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=0, SLOW_SQL_MS=0)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='sam')
+        self.user.profile.is_approved = True
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        SiteSetting.clear_cache()
+
+    def test_server_timing_header_and_slow_logs(self):
+        with self.assertLogs('clubhouse.slow', level='WARNING') as logs:
+            response = self.client.get(reverse('tasksapp:history'), HTTP_HX_REQUEST='true')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertTrue(any('slow sql' in line and 'view=tasksapp.views.history' in line for line in logs.output))
+        self.assertTrue(any('slow request' in line for line in logs.output))
+
+    def test_normalize_sql(self):
+        self.assertEqual(normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  AND n > 10"),
+                         "SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?")
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        overrides = self.settings(PROFILES_DIR=self.dir.name, PROFILES_KEEP=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.staff = User.objects.create(username='admin', is_staff=True)
+        self.staff.profile.is_approved = True
+        self.staff.profile.save()
+
+    def tearDown(self):
+        SiteSetting.clear_cache()
+
+    def test_staff_request_is_profiled_and_listed(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('tasksapp:history') + '?_profile=1')
+        name = response['X-Profile']
+        self.assertRegex(name, r'^\d{8}T\d+-tasksapp-history-admin\.prof$')
+        self.assertTrue(os.path.isfile(os.path.join(self.dir.name, name)))
+
+        self.assertContains(self.client.get(reverse('core:profiles')), name)
+        download = self.client.get(reverse('core:profile_download', args=[name]))
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{name}"')
+        summary = self.client.get(reverse('core:profile_download', args=[name]) + '?format=txt')
+        self.assertContains(summary, 'cumulative')
+
+    def test_old_profiles_are_pruned(self):
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(reverse('tasksapp:history'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(os.listdir(self.dir.name)), 2)
+
+    def test_members_and_plain_requests_are_not_profiled(self):
+        member = User.objects.create(username='sam')
+        member.profile.is_approved = True
+        member.profile.save()
+        self.client.force_login(member)
+        self.assertNotIn('X-Profile', self.client.get(reverse('tasksapp:history') + '?_profile=1'))
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile', self.client.get(reverse('tasksapp:history')))
+        self.assertNotIn('X-Profile', self.client.get(reverse('tasksapp:history'), HTTP_X_PROFILE='0'))
+        self.assertNotIn('X-Profile', self.client.get(reverse('tasksapp:history') + '?_profile=false'))
+        self.assertEqual(os.listdir(self.dir.name), [])
+        self.assertEqual(self.client.get(reverse('core:profile_download', args=['..prof'])).status_code, 404)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='admin', is_staff=True)
+        self.staff.profile.is_approved = True
+        self.staff.profile.save()
+
+    def tearDown(self):
+        SiteSetting.clear_cache()
+
+    def sample(self, text, line):
+        match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.M)
+        return float(match.group(1)) if match else 0.0
+
+    def scrape(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_requests_and_approvals_are_counted(self):
+        before = self.scrape()
+        member = User.objects.create(username='sam')
+        due = timezone.now() + timedelta(days=1)
+        task = Task.objects.create(title='Dishes', week_start=monday_of_week(due.date()), due_at=due,
+                                   created_by=self.staff)
+        assignment = Assignment.objects.create(task=task, assignee=member, status=Assignment.STATUS_SUBMITTED)
+        self.client.get(reverse('tasksapp:history'))
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.approve(self.staff)
+            assignment.award_star(self.staff)
+        after = self.scrape()
+
+        for line in ('clubhouse_approvals_total', 'clubhouse_stars_total',
+                     'clubhouse_request_duration_seconds_count{view="tasksapp:history"}'):
+            with self.subTest(line):
+                self.assertEqual(self.sample(after, line) - self.sample(before, line), 1)
+        self.assertIn('# TYPE clubhouse_request_queries histogram', after)
+        self.assertIn('clubhouse_request_queries_bucket{view="tasksapp:history",le="+Inf"}', after)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_access_needs_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('core:metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('core:metrics'), HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+        response = self.client.get(reverse('core:metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertContains(response, '# TYPE clubhouse_votes_total counter')
+
+    def test_worker_files_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            mine = self.sample(self.scrape(), 'clubhouse_votes_total')
+            other = {'clubhouse_votes_total': [[[], 5]],
+                     'clubhouse_rollover_batch_size': [[[], [0, 0, 1, 0, 0, 0, 0, 0, 0, 120, 1]]]}
+            with open(os.path.join(directory, '999-1.json'), 'w') as fh:
+                json.dump(other, fh)
+            text = self.scrape()
+            self.assertTrue(os.path.isfile(os.path.join(directory, metrics._process_filename())))
+        self.assertEqual(self.sample(text, 'clubhouse_votes_total'), mine + 5)
+        self.assertGreaterEqual(self.sample(text, 'clubhouse_rollover_batch_size_bucket{le="50"}'), 1)
+        self.assertGreaterEqual(self.sample(text, 'clubhouse_rollover_batch_size_count'), 1)
+
+    def test_only_this_hosts_exited_processes_are_folded(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            before = self.sample(self.scrape(), 'clubhouse_votes_total')
+            # PID 999999 is not running here, but may well be on the other host
+            for name in ('other_host-999999-1.json', f'{metrics._HOST}-999999-1.json'):
+                with open(os.path.join(directory, name), 'w') as fh:
+                    json.dump({'clubhouse_votes_total': [[[], 3]]}, fh)
+            text = self.scrape()
+            left = sorted(os.listdir(directory))
+        self.assertEqual(self.sample(text, 'clubhouse_votes_total'), before + 6)
+        self.assertIn('other_host-999999-1.json', left)
+        self.assertNotIn(f'{metrics._HOST}-999999-1.json', left)
+        self.assertTrue(metrics._process_filename().startswith(f'{metrics._HOST}-{os.getpid()}-'))
+
+    def test_concurrent_flushes_never_fail_a_request(self):
+        errors = []
+
+        def vote():
+            try:
+                for _ in range(200):
+                    metrics.VOTES.inc()
+            except Exception as exc:
+                errors.append(exc)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+            threads = [threading.Thread(target=vote) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            metrics.flush()
+            left = os.listdir(directory)
+            with open(os.path.join(directory, metrics._process_filename())) as fh:
+                written = json.load(fh)
+        self.assertEqual(errors, [])
+        self.assertEqual(left, [metrics._process_filename()])
+        self.assertEqual(written['clubhouse_votes_total'], [[[], metrics.VOTES.values[()]]])
+
+    def test_write_errors_are_logged(self):
+        with tempfile.NamedTemporaryFile() as not_a_directory, \
+                self.settings(METRICS_DIR=not_a_directory.name, METRICS_FLUSH_INTERVAL=0), \
+                self.assertLogs('core.metrics', 'ERROR'):
+            metrics.VOTES.inc()
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create(username='sam')
+        self.member.profile.is_approved = True
+        self.member.profile.save()
+
+    def commit_changes(self, *tags):
+        with self.captureOnCommitCallbacks(execute=True):
+            fragments.invalidate(*tags)
+
+    async def test_committed_changes_reach_open_streams(self):
+        await self.async_client.aforce_login(self.member)
+        response = await self.async_client.get(reverse('core:events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        self.assertEqual(len(events.hub), 1)
+
+        await sync_to_async(self.commit_changes)('assignment:7', 'leaderboard', 'site')
+        chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+        self.assertEqual(chunk, 'event: a-7\ndata: a-7\n\nevent: leaderboard\ndata: leaderboard\n\n')
+
+        # A client disconnect cancels the waiting stream, which unsubscribes
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(len(events.hub), 0)
+
+    async def test_stream_is_for_approved_members(self):
+        response = await self.async_client.get(reverse('core:events'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_wsgi_gets_a_finite_refusal(self):
+        # Under WSGI the endless stream would hold a server thread and send nothing
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('core:events'))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(events.hub), 0)
+
+    def test_events_wait_for_commit_and_merge(self):
+        async def listen():
+            subscription = events.hub.subscribe()
+            try:
+                # Published from a worker thread, as a sync view would
+                await asyncio.to_thread(events.announce, ['assignment:1', 'assignment:2'])
+                await asyncio.to_thread(events.announce, ['assignment:1'])
+                await asyncio.sleep(0)
+                return await subscription.next(timeout=1)
+            finally:
+                events.hub.unsubscribe(subscription)
+
+        self.assertEqual(asyncio.run(listen()), {'a-1', 'a-2'})
+        with self.captureOnCommitCallbacks() as callbacks:
+            fragments.invalidate('assignment:3')
+        self.assertEqual(len(callbacks), 1)  # announced only once committed
+
+
+class AsgiEventStreamTests(TransactionTestCase):
+    # Committed rows: the session check runs on a pooled thread with its own connection
+
+    def open_stream(self, cookie=''):
+        async def django_app(scope, receive, send):
+            raise AssertionError("the stream URL must not reach Django's handler")
+
+        app = events.with_event_stream(django_app)
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('core:events'), 'query_string': b'',
+                 'root_path': '', 'headers': [(b'cookie', cookie.encode())]}
+        sent, gone = [], asyncio.Event()
+
+        async def receive():
+            if not sent:
+                return {'type': 'http.request', 'body': b''}
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def run():
+            task = asyncio.ensure_future(app(scope, receive, send))
+            for _ in range(100):
+                if len(events.hub) or task.done():
+                    break
+                await asyncio.sleep(0.01)
+            subscribed = len(events.hub)
+            if subscribed:
+                await asyncio.to_thread(events.announce, ['assignment:5'])
+                await asyncio.sleep(0.05)
+            gone.set()
+            await asyncio.wait_for(task, 1)
+            return subscribed
+
+        return asyncio.run(run()), sent
+
+    def test_stream_is_served_ahead_of_django(self):
+        member = User.objects.create(username='sam')
+        member.profile.is_approved = True
+        member.profile.save()
+        self.client.force_login(member)
+        subscribed, sent = self.open_stream(f'sessionid={self.client.cookies["sessionid"].value}')
+        self.assertEqual(subscribed, 1)
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(m.get('body', b'') for m in sent[1:])
+        self.assertEqual(body, b'retry: 5000\n\nevent: a-5\ndata: a-5\n\n')
+        self.assertEqual(len(events.hub), 0)  # disconnect unsubscribed
+
+    def test_asgi_stream_is_for_approved_members(self):
+        subscribed, sent = self.open_stream()
+        self.assertEqual((subscribed, sent[0]['status']), (0, 403))
 
-# Create your tests here.
@@ -12,4 +12,8 @@ urlpatterns = [
     path('member/<int:user_id>/edit/', views.member_edit, name='member_edit'),
     path('member/<int:user_id>/password/', views.member_password, name='member_password'),
     path('member/<int:user_id>/delete/', views.member_delete, name='member_delete'),
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:name>/', views.profile_download, name='profile_download'),
+    path('metrics', views.metrics, name='metrics'),
+    path('events/', views.events, name='events'),
 ]
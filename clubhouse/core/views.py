@@ -1,14 +1,25 @@
 # File: core/views.py
+import io
+import pstats
+from datetime import datetime
+
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.conf import settings
 from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.models import User
-from django.utils.crypto import get_random_string
+from django.utils.crypto import constant_time_compare, get_random_string
 from django.db import transaction
 from accounts.forms import AdminUserEditForm, AdminProfileAdminForm, AdminPasswordForm
+from . import events as app_events
+from . import metrics as app_metrics
+from .middleware import list_profiles, profile_path, query_budget
 from .models import SiteSetting
 from elections.models import Election
 from accounts.models import Profile
+from tasksapp.services import adjust_points
 
 def is_admin(user):
     return user.is_superuser or user.is_staff
@@ -16,9 +27,9 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def admin_panel(request):
-    settings = SiteSetting.get_solo()
+    settings = SiteSetting.get_cached()
     pending_profiles = Profile.objects.filter(is_approved=False).select_related('user')
-    elections = Election.objects.order_by('-start_at')[:6]
+    elections = Election.objects.select_related('result__winner').order_by('-start_at')[:6]
     return render(request, 'core/admin_panel.html', {
         'settings': settings,
         'pending_profiles': pending_profiles,
@@ -46,6 +57,7 @@ def set_first_leader(request, user_id):
 
 
 # Admin member management views
+@query_budget(4)
 @login_required
 @user_passes_test(is_admin)
 def members(request):
@@ -76,7 +88,13 @@ def member_edit(request, user_id):
         pform = AdminProfileAdminForm(request.POST, instance=user.profile)
         if uform.is_valid() and pform.is_valid():
             uform.save()
-            pform.save()
+            # Point/star edits go through the ledger as an adjustment, not a raw overwrite
+            profile = pform.save(commit=False)
+            points_delta = profile.points_total - pform.initial['points_total']
+            stars_delta = profile.stars_total - pform.initial['stars_total']
+            profile.save(update_fields=['display_name', 'is_approved'])
+            adjust_points(user, points=points_delta, stars=stars_delta,
+                          actor=request.user, note='Member edit')
             messages.success(request, f'Updated {user.username}.')
             return redirect('core:members')
     else:
@@ -118,8 +136,8 @@ def member_delete(request, user_id):
             messages.error(request, "You cannot delete your own account.")
             return redirect('core:members')
         # Clear leader if this user is the current leader
-        site = SiteSetting.get_solo()
-        if site.current_leader_id == user.id:
+        if SiteSetting.get_cached().current_leader_id == user.id:
+            site = SiteSetting.get_solo()
             site.current_leader = None
             site.save(update_fields=['current_leader'])
         username = user.username
@@ -129,3 +147,52 @@ def member_delete(request, user_id):
     return render(request, 'core/admin_member_delete_confirm.html', {
         'user_obj': user,
     })
+
+@login_required
+@user_passes_test(is_admin)
+def profiles(request):
+    rows = [{'name': name, 'size_kib': size / 1024, 'modified': datetime.fromtimestamp(mtime)}
+            for name, size, mtime in list_profiles()]
+    return render(request, 'core/admin_profiles.html', {'profiles': rows})
+
+@login_required
+@user_passes_test(is_admin)
+def profile_download(request, name):
+    path = profile_path(name)
+    if path is None:
+        raise Http404("No such profile.")
+    if request.GET.get('format') == 'txt':
+        # Quick look without leaving the browser: top functions by cumulative time
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats('cumulative').print_stats(60)
+        return HttpResponse(out.getvalue(), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+def metrics(request):
+    # Scrapers authenticate with the bearer token; staff can look from a browser
+    token = settings.METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not (token and constant_time_compare(supplied, token)) and not is_admin(request.user):
+        return HttpResponseForbidden("Metrics require staff access or the metrics token.")
+    return HttpResponse(app_metrics.render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+async def events(request):
+    """
+    Server-Sent Events stream of live changes (see core.events) for approved
+    members; HTMX cards and leaderboards re-fetch themselves on them. ASGI
+    deployments serve this URL through core.events.with_event_stream, which
+    skips the per-request thread this view would hold; this view covers
+    other ASGI setups and tests. Under WSGI (runserver included) the endless
+    stream would be drained into a list on a server thread and never sent,
+    so it answers 404 and the browser's EventSource gives up.
+    """
+    if not isinstance(request, ASGIRequest):
+        raise Http404("Live updates need an ASGI server.")
+    user = await request.auser()
+    if not user.is_authenticated or not await Profile.objects.filter(user=user, is_approved=True).aexists():
+        return HttpResponseForbidden("Live updates are for approved members.")
+    app_events.backend().start()
+    response = StreamingHttpResponse(app_events.event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
@@ -1,6 +1,7 @@
 # File: elections/admin.py
 from django.contrib import admin
-from .models import Election, Vote
+from .models import Election, ElectionResult, Vote
 
 admin.site.register(Election)
 admin.site.register(Vote)
+admin.site.register(ElectionResult)
@@ -0,0 +1,12 @@
+# File: elections/management/commands/backfill_weekly_scores.py
+from django.core.management.base import BaseCommand
+from core.metrics import command_timer
+from tasksapp.services import rebuild_weekly_scores
+
+class Command(BaseCommand):
+    help = "Rebuild the WeeklyScore rollup from the points ledger and assignment history."
+
+    @command_timer('backfill_weekly_scores')
+    def handle(self, *args, **options):
+        written = rebuild_weekly_scores()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} weekly score row(s)."))
@@ -3,16 +3,23 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 from pathlib import Path
 from datetime import datetime
-import shutil
+import sqlite3
 
 class Command(BaseCommand):
     help = "Copy db.sqlite3 into backups/ with timestamp."
 
     def handle(self, *args, **options):
-        db = Path(settings.BASE_DIR) / 'db.sqlite3'
+        db = Path(settings.DATABASES['default']['NAME'])
         backups = Path(settings.BASE_DIR) / 'backups'
         backups.mkdir(exist_ok=True)
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
         dest = backups / f'db_{ts}.sqlite3'
-        shutil.copy2(db, dest)
+        # SQLite's backup API rather than a file copy: consistent while workers
+        # write, and includes commits still in the WAL file (production profile)
+        source, target = sqlite3.connect(db), sqlite3.connect(dest)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
         self.stdout.write(self.style.SUCCESS(f"Backed up DB to {dest}"))
@@ -0,0 +1,66 @@
+# File: elections/management/commands/bench_query_floor.py
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.middleware import forget_members
+from tasksapp.models import Assignment
+
+STOCK_AUTH = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+CACHED_AUTH = 'accounts.middleware.CachedAuthenticationMiddleware'
+
+
+class Command(BaseCommand):
+    help = ("Report per-request query counts for home, history and the HTMX card endpoint "
+            "with Django's stock auth/session setup and with the cached member fast path. "
+            "Runs against the current database inside a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Member to request as (default: first superuser).")
+        parser.add_argument('--repeat', type=int, default=3, help="Measured requests per endpoint.")
+
+    def handle(self, *args, **options):
+        user = (User.objects.filter(username=options['username']).first() if options['username']
+                else User.objects.filter(is_superuser=True).order_by('pk').first())
+        if user is None:
+            raise CommandError("No such user; pass --username of an approved leader/admin.")
+        card = Assignment.objects.order_by('-pk').first()
+
+        endpoints = [('home', 'get', reverse('tasksapp:home')),
+                     ('history', 'get', reverse('tasksapp:history'))]
+        if card:
+            endpoints.append(('card (star)', 'post', reverse('tasksapp:assignment_star', args=[card.pk])))
+
+        stock = [STOCK_AUTH if m == CACHED_AUTH else m for m in settings.MIDDLEWARE]
+        fast = [CACHED_AUTH if m == STOCK_AUTH else m for m in settings.MIDDLEWARE]
+        setups = [
+            ('stock', {'MIDDLEWARE': stock, 'SESSION_ENGINE': 'django.contrib.sessions.backends.db'}),
+            ('cached', {'MIDDLEWARE': fast, 'SESSION_ENGINE': settings.SESSION_ENGINE}),
+        ]
+
+        results = {}
+        with transaction.atomic():
+            for label, overrides in setups:
+                with override_settings(**overrides):
+                    forget_members(user.pk)
+                    client = Client(HTTP_HX_REQUEST='true')
+                    client.force_login(user)
+                    for name, method, url in endpoints:
+                        getattr(client, method)(url)  # warm caches and the session
+                        counts = []
+                        for _ in range(options['repeat']):
+                            with CaptureQueriesContext(connection) as ctx:
+                                getattr(client, method)(url)
+                            counts.append(len(ctx))
+                        results[(label, name)] = min(counts)
+            transaction.set_rollback(True)
+        forget_members(user.pk)
+
+        self.stdout.write(f"{'endpoint':<14}{'stock':>8}{'cached':>8}{'saved':>8}")
+        for name, _, _ in endpoints:
+            before, after = results[('stock', name)], results[('cached', name)]
+            self.stdout.write(f"{name:<14}{before:>8}{after:>8}{before - after:>8}")
@@ -1,14 +1,20 @@
 # File: elections/management/commands/close_ended_elections.py
 from django.core.management.base import BaseCommand
+from core.metrics import command_timer
 from django.utils import timezone
 from elections.models import Election
 
 class Command(BaseCommand):
-    help = "Close any elections past end_at and set leader."
+    help = "Finalize elections past end_at (oldest first) and set the leader from the newest."
 
+    @command_timer('close_ended_elections')
     def handle(self, *args, **options):
         now = timezone.now()
-        ended = Election.objects.filter(end_at__lt=now)
+        ended = Election.objects.filter(end_at__lt=now, finalized_at__isnull=True).order_by('end_at', 'pk')
+        finalized = 0
         for e in ended:
             winner = e.finalize_and_set_leader()
+            finalized += 1
             self.stdout.write(self.style.SUCCESS(f"Finalized election {e.id}, leader: {winner}"))
+        if not finalized:
+            self.stdout.write("No elections waiting to be finalized.")
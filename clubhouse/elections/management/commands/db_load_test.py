@@ -0,0 +1,172 @@
+# File: elections/management/commands/db_load_test.py
+import logging
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmarks import BENCH_CACHES
+from elections.models import Election
+from tasksapp.models import Assignment
+
+# 'stock' is Django's default SQLite setup (rollback journal, deferred
+# transactions, a new connection per request); 'production' is
+# settings.SQLITE_PRODUCTION
+STOCK = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'}}
+
+
+def _copy(source, target):
+    """Consistent copy through SQLite's backup API (includes a WAL's pending pages)."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+ROLES = ('approve', 'vote', 'read')
+
+
+def _client(kind, user_pk, targets, election_pk, start_at, seconds, results):
+    """One client process: repeat its request until the run ends, timing each one."""
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)  # failures are counted, not logged
+    client = Client(HTTP_HX_REQUEST='true')
+    client.force_login(User.objects.get(pk=user_pk))
+    close_old_connections()
+    bulk, vote = reverse('tasksapp:assignment_bulk'), reverse('elections:vote', args=[election_pk])
+    home = reverse('tasksapp:home')
+    samples, locked, failed, i = [], 0, 0, 0
+    time.sleep(max(0, start_at - time.time()))
+    while time.time() < start_at + seconds:
+        started = time.perf_counter()
+        try:
+            if kind == 'approve':
+                # The review queue's bulk approve: reads the rows, then writes them
+                client.post(bulk, {'action': 'approve', 'ids': targets[2 * i:2 * i + 2]})
+            elif kind == 'vote':
+                client.post(vote, {'candidate': targets[i % len(targets)]})
+            else:
+                client.get(home)
+        except OperationalError as exc:
+            if 'locked' in str(exc):
+                locked += 1
+            else:
+                failed += 1
+        except Exception:
+            failed += 1
+        else:
+            samples.append((time.perf_counter() - started) * 1000)
+        close_old_connections()  # what request_finished does outside the test client
+        i += 1
+    connection.close()
+    results.put((kind, samples, locked, failed))
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class Command(BaseCommand):
+    help = ("Hammer a scratch copy of the database with concurrent approvals, votes and board reads, "
+            "once with the stock SQLite setup and once with the production profile, and report "
+            "'database is locked' errors and latency percentiles for each.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=12,
+                            help="Concurrent client processes, split between approve, vote and read.")
+        parser.add_argument('--seconds', type=float, default=10, help="Run time per profile.")
+        parser.add_argument('--profile', action='append', choices=['stock', 'production'],
+                            help="Only run this profile (repeatable).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("db_load_test exercises SQLite settings; the default database is not SQLite.")
+        profiles = options['profile'] or ['stock', 'production']
+        original = dict(connection.settings_dict)
+        scratch = tempfile.mkdtemp(prefix='clubhouse-load-')
+        template = os.path.join(scratch, 'template.sqlite3')
+        _copy(str(original['NAME']), template)
+        try:
+            # Private locmem caches: sessions, members and fragments stay out of the real cache
+            with override_settings(CACHES=BENCH_CACHES):
+                for profile in profiles:
+                    path = os.path.join(scratch, f'{profile}.sqlite3')
+                    _copy(template, path)
+                    overrides = STOCK if profile == 'stock' else settings.SQLITE_PRODUCTION
+                    self._use(dict(original, NAME=path, **overrides))
+                    self._report(profile, self._run(options['clients'], options['seconds']))
+        finally:
+            self._use(original)
+            for name in os.listdir(scratch):
+                os.remove(os.path.join(scratch, name))
+            os.rmdir(scratch)
+
+    def _use(self, settings_dict):
+        # Every thread's connection is built from this same dict, as in the test runner
+        connections.close_all()
+        connection.settings_dict.clear()
+        connection.settings_dict.update(settings_dict)
+
+    def _run(self, clients, seconds):
+        leader = User.objects.filter(is_superuser=True).order_by('pk').first() or \
+            User.objects.filter(is_staff=True).order_by('pk').first()
+        voters = list(User.objects.filter(is_active=True, profile__is_approved=True).order_by('pk')[:clients])
+        if leader is None or not voters:
+            raise CommandError("Needs an admin and approved members; try `generate_dataset` first.")
+        now = timezone.now()
+        election = Election.objects.filter(start_at__lte=now, end_at__gt=now, finalized_at__isnull=True).first() or \
+            Election.objects.create(start_at=now, end_at=now + timedelta(days=1))
+        pending = list(Assignment.objects.exclude(status=Assignment.STATUS_APPROVED)
+                       .order_by('-pk').values_list('pk', flat=True)[:20000])
+
+        plan = []
+        for n in range(clients):
+            kind = ROLES[n % len(ROLES)]
+            user = leader if kind == 'approve' else voters[n % len(voters)]
+            plan.append((kind, user.pk, pending[n::clients] if kind == 'approve' else [v.pk for v in voters]))
+        connections.close_all()  # children must not share the parent's connection
+
+        # One process per client, like separate server workers; threads would queue on the GIL instead
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        start_at = time.time() + 1 + clients * 0.05  # everyone logged in and waiting by then
+        processes = [context.Process(target=_client, args=(*job, election.pk, start_at, seconds, results))
+                     for job in plan]
+        for process in processes:
+            process.start()
+        totals = {kind: {'samples': [], 'locked': 0, 'failed': 0} for kind in ROLES}
+        for _ in processes:
+            kind, samples, locked, failed = results.get()
+            totals[kind]['samples'] += samples
+            totals[kind]['locked'] += locked
+            totals[kind]['failed'] += failed
+        for process in processes:
+            process.join()
+        return totals, seconds
+
+    def _report(self, profile, result):
+        totals, seconds = result
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{profile}:"))
+        for kind in ROLES:
+            ok, locked, failed = totals[kind]['samples'], totals[kind]['locked'], totals[kind]['failed']
+            line = (f"  {kind:<8} {len(ok):>6} ok ({len(ok) / seconds:>7.1f}/s)  {locked:>5} locked"
+                    f"  {failed:>4} other errors")
+            if ok:
+                line += (f"  p50 {statistics.median(ok):>7.1f}  p95 {_percentile(ok, 95):>7.1f}"
+                         f"  p99 {_percentile(ok, 99):>7.1f}  max {max(ok):>7.1f} ms")
+            self.stdout.write(self.style.ERROR(line) if locked else line)
@@ -0,0 +1,27 @@
+# File: elections/management/commands/generate_dataset.py
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.datasets import DATASET_PREFIX, generate_dataset
+
+class Command(BaseCommand):
+    help = ("Fill the database with a synthetic clubhouse (members, weeks of tasks and assignments, "
+            "stars, ledger, elections and votes) for benchmarking. Do not run against real data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--weeks', type=int, default=8)
+        parser.add_argument('--tasks-per-week', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=DATASET_PREFIX).exists():
+            raise CommandError(f"Users named '{DATASET_PREFIX}*' already exist; use a fresh database.")
+        started = time.monotonic()
+        stats = generate_dataset(members=options['members'], weeks=options['weeks'],
+                                 tasks_per_week=options['tasks_per_week'], seed=options['seed'])
+        elapsed = time.monotonic() - started
+        for name, count in stats.items():
+            self.stdout.write(f"{name:<14}{count:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Dataset generated in {elapsed:.2f}s."))
@@ -0,0 +1,50 @@
+# File: elections/management/commands/import_tasks.py
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.metrics import command_timer
+from core.models import SiteSetting
+from tasksapp.imports import (IMPORT_CHUNK_SIZE, TaskImportError, detect_format, import_tasks,
+                              parse_tasks)
+
+class Command(BaseCommand):
+    help = ("Create tasks and assignments from a CSV or JSON file (title, description, week_start, due_at, "
+            "assignees). Safe to re-run: existing tasks and assignments are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help="Default: from the file extension.")
+        parser.add_argument('--created-by', help="Username recorded as task creator (default: current leader).")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                            help="Rows per INSERT.")
+
+    @command_timer('import_tasks')
+    def handle(self, *args, **options):
+        try:
+            data = Path(options['path']).read_text(encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(exc)
+        if options['created_by']:
+            creator = User.objects.filter(username=options['created_by']).first()
+        else:
+            creator = SiteSetting.get_solo().current_leader
+        if creator is None:
+            raise CommandError("No task creator: pass --created-by or set a leader first.")
+
+        started = time.monotonic()
+        try:
+            rows = parse_tasks(data, options['format'] or detect_format(options['path'], data))
+            stats = import_tasks(rows, created_by=creator, chunk_size=options['chunk_size'])
+        except TaskImportError as exc:
+            raise CommandError(exc)
+        elapsed = time.monotonic() - started
+        per_second = (lambda n: n / elapsed if elapsed else 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} row(s): {stats['tasks_created']} new task(s), "
+            f"{stats['assignments_created']} new assignment(s)."
+        ))
+        self.stdout.write(f"{elapsed:.2f}s, {per_second(stats['rows']):.0f} rows/s, "
+                          f"{per_second(stats['assignments_created']):.0f} assignments/s")
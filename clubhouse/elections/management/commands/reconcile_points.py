@@ -0,0 +1,26 @@
+# File: elections/management/commands/reconcile_points.py
+from django.core.management.base import BaseCommand
+from core.metrics import command_timer
+from tasksapp.services import reconcile_profile_totals, RECONCILE_CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = "Compare profile point/star totals with the points ledger and report (or fix) drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Rewrite drifted totals from the ledger.")
+        parser.add_argument('--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE)
+
+    @command_timer('reconcile_points')
+    def handle(self, *args, **options):
+        drift = reconcile_profile_totals(chunk_size=options['chunk_size'], fix=options['fix'])
+        for d in drift:
+            self.stdout.write(
+                f"user {d['user_id']}: points {d['points_total']} (ledger {d['ledger_points']}), "
+                f"stars {d['stars_total']} (ledger {d['ledger_stars']})"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No drift: profile totals match the ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} profile(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} profile(s) drifted; re-run with --fix to repair."))
@@ -1,35 +1,35 @@
 # File: tasksapp/management/commands/rollover_assignments.py
+import time
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from tasksapp.models import Assignment, Task, monday_of_week, POINTS_LATE_PENALTY
+from core.metrics import command_timer
+from tasksapp.rollover import rollover, ROLLOVER_CHUNK_SIZE
 
 class Command(BaseCommand):
-    help = "Rollover incomplete assignments to next week and apply -10 penalty."
+    help = ("Rollover incomplete assignments to next week and apply the -10 penalty once. "
+            "Idempotent: an interrupted run resumes and a repeated run is a no-op.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=ROLLOVER_CHUNK_SIZE,
+                            help="Assignments per transaction.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Run the full pipeline but roll every chunk back.")
 
+    @command_timer('rollover_assignments')
     def handle(self, *args, **options):
-        now = timezone.now()
-        incomplete = Assignment.objects.select_related('task', 'assignee', 'assignee__profile') \
-            .filter(task__due_at__lt=now) \
-            .exclude(status=Assignment.STATUS_APPROVED)
+        started = time.monotonic()
+
+        def progress(stats, last_pk):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  ... {stats['rolled']} rolled (checkpoint: assignment #{last_pk})")
 
-        for a in incomplete:
-            # Penalty
-            p = a.assignee.profile
-            p.points_total += POINTS_LATE_PENALTY
-            p.save()
+        stats = rollover(chunk_size=options['chunk_size'], dry_run=options['dry_run'], progress=progress)
+        elapsed = time.monotonic() - started
+        rate = stats['rolled'] / elapsed if elapsed else 0
 
-            # Create next week task (per-member rollover of the same task title)
-            next_week = a.task.week_start + timedelta(days=7)
-            due_shift = a.task.due_at + timedelta(days=7)
-            new_task, _ = Task.objects.get_or_create(
-                title=a.task.title,
-                description=a.task.description,
-                week_start=next_week,
-                defaults={'due_at': due_shift, 'created_by': a.task.created_by}
-            )
-            # Create assignment for same member
-            new_a = Assignment.objects.create(
-                task=new_task, assignee=a.assignee, rolled_from=a
-            )
-            self.stdout.write(f"Rolled {a} to {new_a}")
+        prefix = "[dry run] Would roll" if options['dry_run'] else "Rolled"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {stats['rolled']} assignment(s): {stats['assignments_created']} new assignment(s), "
+            f"{stats['tasks_created']} new task(s), {stats['penalized']} penalized."
+        ))
+        self.stdout.write(f"{elapsed:.2f}s, {rate:.0f} assignments/s")
@@ -0,0 +1,50 @@
+# File: elections/management/commands/run_benchmarks.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import SCENARIOS, compare, run_benchmarks
+
+class Command(BaseCommand):
+    help = ("Benchmark home (and its sections, sequential vs gathered), history, members, approve, vote, "
+            "rollover and election close against generated datasets (fresh test database per size) "
+            "and write a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='50,200,1000', help="Comma-separated member counts.")
+        parser.add_argument('--weeks', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help="Only run this scenario (repeatable).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='benchmarks.json', help="Where to write the JSON report.")
+        parser.add_argument('--baseline', help="Earlier report to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p50 slowdown versus the baseline (0.2 = 20%%).")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers.")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+
+        report = run_benchmarks(sizes, weeks=options['weeks'], iterations=options['iterations'],
+                                scenarios=options['scenario'], seed=options['seed'], log=self.stdout.write)
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if baseline is None:
+            return
+        rows = compare(report, baseline, tolerance=options['tolerance'])
+        for r in rows:
+            line = (f"{r['size']:>6} {r['scenario']:<22} p50 {r['baseline_p50_ms']:.2f} -> {r['p50_ms']:.2f} ms "
+                    f"(x{r['ratio']:.2f}), queries {r['baseline_queries']} -> {r['queries']}")
+            self.stdout.write(self.style.ERROR(line) if r['regressed'] else line)
+        regressed = [r for r in rows if r['regressed']]
+        if regressed and options['fail_on_regression']:
+            raise CommandError(f"{len(regressed)} benchmark(s) regressed against {options['baseline']}.")
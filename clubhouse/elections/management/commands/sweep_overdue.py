@@ -0,0 +1,15 @@
+# File: elections/management/commands/sweep_overdue.py
+from django.core.management.base import BaseCommand
+from core.metrics import command_timer
+from tasksapp.sweeper import sweep_overdue, SWEEP_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = "Apply the -10 late penalty once to every overdue assignment (safe to re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    @command_timer('sweep_overdue')
+    def handle(self, *args, **options):
+        swept = sweep_overdue(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Penalized {swept} overdue assignment(s)."))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def store_past_results(apps, schema_editor):
+    # Ended elections were re-counted on every close_ended_elections run; store
+    # their results once. The current leader is left untouched.
+    Election = apps.get_model('elections', 'Election')
+    ElectionResult = apps.get_model('elections', 'ElectionResult')
+    Vote = apps.get_model('elections', 'Vote')
+    now = django.utils.timezone.now()
+    for election in Election.objects.filter(end_at__lt=now).order_by('end_at'):
+        rows = list(Vote.objects
+                    .filter(election=election)
+                    .values('candidate_id', 'candidate__username')
+                    .annotate(votes=models.Count('id'), first_vote_at=models.Min('last_vote_at'))
+                    .order_by('-votes', 'first_vote_at', 'candidate_id'))
+        top = [r for r in rows if r['votes'] == rows[0]['votes']] if rows else []
+        ElectionResult.objects.create(
+            election=election,
+            counts=[{'candidate_id': r['candidate_id'], 'username': r['candidate__username'],
+                     'votes': r['votes']} for r in rows],
+            total_votes=sum(r['votes'] for r in rows),
+            winner_id=top[0]['candidate_id'] if top else None,
+            tie_break={'rule': 'earliest vote', 'tied': [
+                {'candidate_id': r['candidate_id'], 'first_vote_at': r['first_vote_at'].isoformat()}
+                for r in top]} if len(top) > 1 else None,
+            created_at=now,
+        )
+        election.finalized_at = now
+        election.save(update_fields=['finalized_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElectionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counts', models.JSONField(default=list)),
+                ('total_votes', models.IntegerField(default=0)),
+                ('tie_break', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='election',
+            name='finalized_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(condition=models.Q(('finalized_at__isnull', True)), fields=['end_at'], name='election_unfinalized_end_idx'),
+        ),
+        migrations.AddField(
+            model_name='electionresult',
+            name='election',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result', to='elections.election'),
+        ),
+        migrations.AddField(
+            model_name='electionresult',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='elections_won', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(store_past_results, migrations.RunPython.noop),
+    ]
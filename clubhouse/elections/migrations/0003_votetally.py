@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_tallies(apps, schema_editor):
+    Vote = apps.get_model('elections', 'Vote')
+    VoteTally = apps.get_model('elections', 'VoteTally')
+    VoteTally.objects.bulk_create(
+        [VoteTally(election_id=row['election_id'], candidate_id=row['candidate_id'], votes=row['votes'])
+         for row in Vote.objects.values('election_id', 'candidate_id').annotate(votes=models.Count('id'))],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0002_election_result'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('votes', models.IntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='elections.election')),
+            ],
+            options={
+                'unique_together': {('election', 'candidate')},
+            },
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
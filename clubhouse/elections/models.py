@@ -1,5 +1,5 @@
 # File: elections/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from core.models import SiteSetting
@@ -8,6 +8,14 @@ class Election(models.Model):
     start_at = models.DateTimeField()
     end_at = models.DateTimeField()
     created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # close_ended_elections: ended elections still waiting for a result
+            models.Index(fields=['end_at'], condition=models.Q(finalized_at__isnull=True),
+                         name='election_unfinalized_end_idx'),
+        ]
 
     def __str__(self):
         return f"Election {self.start_at:%Y-%m-%d}"
@@ -18,27 +26,95 @@ class Election(models.Model):
         return self.start_at <= now <= self.end_at
 
     def finalize_and_set_leader(self):
-        # Compute votes, tie-break by earliest last_vote_at
-        votes = (Vote.objects
-                 .filter(election=self)
-                 .values('candidate')
-                 .annotate(count=models.Count('id')))
-        if not votes:
-            return None
-        max_count = max(v['count'] for v in votes)
-        top_candidates = [v['candidate'] for v in votes if v['count'] == max_count]
-        if len(top_candidates) == 1:
-            winner_id = top_candidates[0]
-        else:
-            earliest = (Vote.objects
-                        .filter(election=self, candidate_id__in=top_candidates)
-                        .order_by('last_vote_at').first())
-            winner_id = earliest.candidate_id if earliest else top_candidates[0]
-        winner = User.objects.get(pk=winner_id)
-        settings = SiteSetting.get_solo()
-        settings.current_leader = winner
-        settings.save()
-        return winner
+        """
+        Count the votes once, store them as an ElectionResult and return the
+        winner (None when nobody voted). Already-finalized elections return
+        their stored winner without recounting. Only the most recently ended
+        finalized election decides the leader, so finalizing an old election
+        late never overrides a newer result.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = (Election.objects
+                       .filter(pk=self.pk, finalized_at__isnull=True)
+                       .update(finalized_at=now))
+            if not claimed:
+                result = ElectionResult.objects.select_related('winner').filter(election=self).first()
+                return result.winner if result else None
+
+            # One aggregate: per-candidate count plus their earliest vote for tie-breaks
+            rows = list(Vote.objects
+                        .filter(election=self)
+                        .values('candidate_id', 'candidate__username')
+                        .annotate(votes=models.Count('id'), first_vote_at=models.Min('last_vote_at'))
+                        .order_by('-votes', 'first_vote_at', 'candidate_id'))
+            winner_id, tie_break = None, None
+            if rows:
+                top = [r for r in rows if r['votes'] == rows[0]['votes']]
+                winner_id = top[0]['candidate_id']
+                if len(top) > 1:
+                    tie_break = {'rule': 'earliest vote', 'tied': [
+                        {'candidate_id': r['candidate_id'], 'first_vote_at': r['first_vote_at'].isoformat()}
+                        for r in top]}
+            result = ElectionResult.objects.create(
+                election=self,
+                counts=[{'candidate_id': r['candidate_id'], 'username': r['candidate__username'],
+                         'votes': r['votes']} for r in rows],
+                total_votes=sum(r['votes'] for r in rows),
+                winner_id=winner_id,
+                tie_break=tie_break,
+                created_at=now,
+            )
+            self.finalized_at = now
+
+            newer = Election.objects.filter(finalized_at__isnull=False, end_at__gt=self.end_at).exists()
+            if winner_id and not newer and SiteSetting.get_cached().current_leader_id != winner_id:
+                settings = SiteSetting.get_solo()
+                settings.current_leader_id = winner_id
+                settings.save(update_fields=['current_leader'])
+        return result.winner
+
+    def cast_vote(self, voter, candidate):
+        """
+        Record (or change) `voter`'s ballot and keep the live VoteTally in step,
+        without reading the previous ballot first: the old candidate's counter
+        is decremented through a subquery, the ballot is upserted on
+        (election, voter), then the new candidate's counter is incremented.
+        Re-voting for the same candidate nets to zero.
+        """
+        with transaction.atomic():
+            previous = Vote.objects.filter(election=self, voter=voter).values('candidate_id')[:1]
+            VoteTally.objects.filter(election=self, candidate_id=models.Subquery(previous)) \
+                .update(votes=models.F('votes') - 1)
+            Vote.objects.bulk_create(
+                [Vote(election=self, voter=voter, candidate=candidate)],
+                update_conflicts=True, unique_fields=['election', 'voter'],
+                update_fields=['candidate', 'last_vote_at'],
+            )
+            bump = VoteTally.objects.filter(election=self, candidate=candidate)
+            if not bump.update(votes=models.F('votes') + 1):
+                VoteTally.objects.bulk_create([VoteTally(election=self, candidate=candidate)],
+                                              ignore_conflicts=True)
+                bump.update(votes=models.F('votes') + 1)
+
+    def live_tally(self):
+        """Current standings from the tally table: one row per candidate, most votes first."""
+        return list(VoteTally.objects
+                    .filter(election=self, votes__gt=0)
+                    .order_by('-votes', 'candidate__username')
+                    .values('candidate_id', 'candidate__username', 'votes'))
+
+class ElectionResult(models.Model):
+    """Outcome of a finalized election, stored so pages never recount votes."""
+    election = models.OneToOneField(Election, on_delete=models.CASCADE, related_name='result')
+    counts = models.JSONField(default=list)  # [{candidate_id, username, votes}], most votes first
+    total_votes = models.IntegerField(default=0)
+    winner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='elections_won')
+    tie_break = models.JSONField(null=True, blank=True)  # {rule, tied: [{candidate_id, first_vote_at}]}
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Result of {self.election}"
 
 class Vote(models.Model):
     election = models.ForeignKey(Election, on_delete=models.CASCADE)
@@ -48,3 +124,12 @@ class Vote(models.Model):
 
     class Meta:
         unique_together = ('election', 'voter')
+
+class VoteTally(models.Model):
+    """Running per-candidate vote count, maintained by Election.cast_vote for live results."""
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='tallies')
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    votes = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('election', 'candidate')
@@ -1,3 +1,114 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import SiteSetting
+from .models import Election, ElectionResult, Vote, VoteTally
+
+
+def make_member(username, **extra):
+    user = User.objects.create(username=username, **extra)
+    user.profile.is_approved = True
+    user.profile.save()
+    return user
+
+
+class ElectionFinalizeTests(TestCase):
+    def setUp(self):
+        SiteSetting.clear_cache()
+        self.admin = make_member('admin', is_staff=True)
+        self.alice = make_member('alice')
+        self.bob = make_member('bob')
+        self.carol = make_member('carol')
+
+    def tearDown(self):
+        SiteSetting.clear_cache()
+
+    def ended_election(self, days_ago, ballots):
+        now = timezone.now()
+        e = Election.objects.create(start_at=now - timedelta(days=days_ago + 1), end_at=now - timedelta(days=days_ago))
+        for i, (voter, candidate) in enumerate(ballots):
+            Vote.objects.create(election=e, voter=voter, candidate=candidate)
+            Vote.objects.filter(election=e, voter=voter).update(last_vote_at=now - timedelta(minutes=60 - i))
+        return e
+
+    def test_result_is_stored_with_tie_break(self):
+        e = self.ended_election(1, [(self.alice, self.bob), (self.bob, self.carol), (self.carol, self.carol),
+                                    (self.admin, self.bob)])
+        self.assertEqual(e.finalize_and_set_leader(), self.bob)
+        result = ElectionResult.objects.get(election=e)
+        self.assertEqual([(c['username'], c['votes']) for c in result.counts], [('bob', 2), ('carol', 2)])
+        self.assertEqual(result.total_votes, 4)
+        self.assertEqual([t['candidate_id'] for t in result.tie_break['tied']], [self.bob.pk, self.carol.pk])
+        self.assertEqual(SiteSetting.get_solo().current_leader, self.bob)
+
+        # A second finalize reads the stored result instead of recounting
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(e.finalize_and_set_leader(), self.bob)
+        self.assertFalse([q for q in ctx.captured_queries if 'elections_vote' in q['sql']])
+
+    def test_command_only_finalizes_new_elections_and_newest_sets_leader(self):
+        old = self.ended_election(8, [(self.alice, self.alice)])
+        new = self.ended_election(1, [(self.alice, self.carol)])
+        new.finalize_and_set_leader()
+
+        call_command('close_ended_elections', stdout=StringIO())
+        old.refresh_from_db()
+        self.assertIsNotNone(old.finalized_at)
+        self.assertEqual(SiteSetting.get_solo().current_leader, self.carol)
+        self.assertEqual(ElectionResult.objects.count(), 2)
+
+    def test_manage_page_reads_stored_results(self):
+        e = self.ended_election(1, [(self.alice, self.bob)])
+        e.finalize_and_set_leader()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('elections:manage'))
+        self.assertContains(response, 'Winner: <strong>bob</strong>')
+        self.assertFalse([q for q in ctx.captured_queries if 'elections_vote' in q['sql']])
+
+
+class VoteTallyTests(TestCase):
+    def setUp(self):
+        self.alice = make_member('alice')
+        self.bob = make_member('bob')
+        self.carol = make_member('carol')
+        now = timezone.now()
+        self.election = Election.objects.create(start_at=now - timedelta(hours=1), end_at=now + timedelta(hours=1))
+
+    def tallies(self):
+        return dict(VoteTally.objects.filter(election=self.election).values_list('candidate__username', 'votes'))
+
+    def test_changing_a_vote_moves_the_tally(self):
+        self.election.cast_vote(self.alice, self.bob)
+        self.election.cast_vote(self.carol, self.bob)
+        self.election.cast_vote(self.alice, self.carol)
+        self.election.cast_vote(self.alice, self.carol)
+        self.assertEqual(self.tallies(), {'bob': 1, 'carol': 1})
+        self.assertEqual(Vote.objects.get(election=self.election, voter=self.alice).candidate, self.carol)
+
+    def test_vote_writes_without_reading_the_old_ballot(self):
+        self.election.cast_vote(self.alice, self.bob)
+        with CaptureQueriesContext(connection) as ctx:
+            self.election.cast_vote(self.alice, self.carol)
+            self.election.cast_vote(self.alice, self.bob)
+        sql = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertFalse([q for q in sql if q.startswith('SELECT')])
+        # decrement, upsert, increment; carol's first vote also creates her counter (+2)
+        self.assertEqual(len(sql), 5 + 3)
 
-# Create your tests here.
+    def test_results_endpoint(self):
+        self.client.force_login(self.alice)
+        self.client.post(reverse('elections:vote', args=[self.election.pk]), {'candidate': self.bob.pk})
+        data = self.client.get(reverse('elections:results', args=[self.election.pk])).json()
+        self.assertEqual(data['total_votes'], 1)
+        self.assertEqual(data['candidates'], [{'id': self.bob.pk, 'username': 'bob', 'votes': 1}])
+        fragment = self.client.get(reverse('elections:results', args=[self.election.pk]), HTTP_HX_REQUEST='true')
+        self.assertContains(fragment, '<td>bob</td><td>1</td>', html=False)
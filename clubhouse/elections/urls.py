@@ -9,5 +9,6 @@ urlpatterns = [
     path('manage/', views.manage, name='manage'),
     path('create/', views.create_election, name='create'),
     path('vote/<int:election_id>/', views.vote, name='vote'),
+    path('results/<int:election_id>/', views.results, name='results'),
     path('close/<int:election_id>/', views.close_election, name='close'),
 ]
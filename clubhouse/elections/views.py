@@ -2,17 +2,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.http import JsonResponse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from .models import Election, Vote
 from .forms import ElectionForm, VoteForm
+from core import metrics
+from core.middleware import query_budget
 from core.models import SiteSetting
 from datetime import timedelta
 
 def is_admin_or_leader(user):
-    settings = SiteSetting.get_solo()
+    settings = SiteSetting.get_cached()
     return user.is_superuser or user.is_staff or (settings.current_leader_id == user.id)
 
+@query_budget(3)
 @login_required
 def current(request):
     now = timezone.now()
@@ -32,7 +36,7 @@ def current(request):
 @login_required
 @user_passes_test(is_admin_or_leader)
 def manage(request):
-    elections = Election.objects.order_by('-start_at')[:12]
+    elections = Election.objects.select_related('result__winner').order_by('-start_at')[:12]
     return render(request, 'elections/manage.html', {'elections': elections})
 
 @login_required
@@ -52,6 +56,7 @@ def create_election(request):
         form = ElectionForm(initial=initial)
     return render(request, 'elections/new.html', {'form': form})
 
+@query_budget(7)
 @login_required
 def vote(request, election_id):
     election = get_object_or_404(Election, pk=election_id)
@@ -62,21 +67,40 @@ def vote(request, election_id):
     form = VoteForm(request.POST or None, candidates_qs=candidates)
     if request.method == 'POST' and form.is_valid():
         candidate = form.cleaned_data['candidate']
-        v, _ = Vote.objects.update_or_create(
-            election=election, voter=request.user,
-            defaults={'candidate': candidate}
-        )
+        election.cast_vote(request.user, candidate)
+        metrics.VOTES.inc()
         messages.success(request, f'Voted for {candidate.username}. You can change it until close.')
         return redirect('elections:current')
     messages.error(request, 'Invalid vote.')
     return redirect('elections:current')
 
+@query_budget(2)
+@login_required
+def results(request, election_id):
+    """Live standings from the tally table: an HTML fragment for HTMX polling, JSON otherwise."""
+    election = get_object_or_404(Election, pk=election_id)
+    tally = election.live_tally()
+    if request.headers.get('HX-Request'):
+        return render(request, 'elections/_tally.html', {'election': election, 'tally': tally})
+    return JsonResponse({
+        'election': election.id,
+        'open': election.is_open,
+        'total_votes': sum(row['votes'] for row in tally),
+        'candidates': [{'id': row['candidate_id'], 'username': row['candidate__username'], 'votes': row['votes']}
+                       for row in tally],
+    })
+
 @login_required
 @user_passes_test(is_admin_or_leader)
 def close_election(request, election_id):
     election = get_object_or_404(Election, pk=election_id)
-    election.end_at = timezone.now()
-    election.save()
+    if election.finalized_at:
+        messages.info(request, 'Election was already finalized.')
+        return redirect('elections:manage')
+    now = timezone.now()
+    if election.end_at > now:
+        election.end_at = now
+        election.save(update_fields=['end_at'])
     winner = election.finalize_and_set_leader()
     if winner:
         messages.success(request, f'Election closed. Leader is {winner.username}.')
@@ -0,0 +1,19 @@
+# File: tasksapp/claims.py
+from django.db import transaction
+
+# Batch writers (sweeper, review queue, rollover) select their rows, then claim
+# them with a guarded UPDATE; touching fewer rows than selected means a
+# concurrent writer got in between, and the batch starts again from a fresh read
+
+class ClaimLost(Exception):
+    """A concurrent writer claimed some of the selected rows; retry the batch."""
+
+
+def retrying(batch):
+    """Run `batch` in a transaction, again from scratch if a concurrent writer got in between."""
+    while True:
+        try:
+            with transaction.atomic():
+                return batch()
+        except ClaimLost:
+            continue
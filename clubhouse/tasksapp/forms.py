@@ -8,10 +8,16 @@ class TaskForm(forms.ModelForm):
         queryset=User.objects.filter(is_active=True, profile__is_approved=True),
         required=False, help_text="Assign members to this task"
     )
+    assign_all = forms.BooleanField(required=False, label="Assign to all approved members")
     class Meta:
         model = Task
-        fields = ['title', 'description', 'week_start', 'due_at', 'assignees']
+        fields = ['title', 'description', 'week_start', 'due_at', 'assignees', 'assign_all']
         widgets = {
             'week_start': forms.DateInput(attrs={'type': 'date'}),
             'due_at': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row or a JSON list: title, description, "
+                                     "week_start, due_at, assignees (usernames or 'all')")
+    format = forms.ChoiceField(choices=[('auto', 'Detect'), ('csv', 'CSV'), ('json', 'JSON')], initial='auto')
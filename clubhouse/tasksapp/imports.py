@@ -0,0 +1,174 @@
+# File: tasksapp/imports.py
+import csv
+import io
+import json
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core import fragments
+from .models import Assignment, Task, monday_of_week
+
+IMPORT_CHUNK_SIZE = 1000
+ALL_MEMBERS = 'all'
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+
+
+class TaskImportError(ValueError):
+    """The import file is malformed; nothing was written."""
+
+
+def approved_member_ids():
+    return list(User.objects.filter(is_active=True, profile__is_approved=True).values_list('pk', flat=True))
+
+
+def create_assignments(pairs, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create the assignments for (task, user_id) pairs with chunked bulk_create;
+    returns how many were new. Existing (task, assignee) pairs are skipped (one
+    lookup up front, ignore_conflicts for concurrent writers), and due_at is
+    copied from the task here because bulk_create skips save().
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return 0
+    existing = set(Assignment.objects.filter(task_id__in={task.pk for task, _ in pairs})
+                   .values_list('task_id', 'assignee_id'))
+    rows = [Assignment(task_id=task.pk, assignee_id=uid, due_at=task.due_at)
+            for task, uid in pairs if (task.pk, uid) not in existing]
+    Assignment.objects.bulk_create(rows, batch_size=chunk_size, ignore_conflicts=True)
+    fragments.invalidate('assignments', 'leaderboard')  # bulk_create sends no post_save
+    return len(rows)
+
+
+def _aware(value, row):
+    try:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:  # well formed but not a real date, e.g. 2026-02-30
+        parsed = None
+    if parsed is None:
+        raise TaskImportError(f"row {row}: due_at {value!r} is not an ISO date-time")
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def _text(value, field, row):
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise TaskImportError(f"row {row}: {field} must be text, not {type(value).__name__}")
+    return value.strip()
+
+
+def _assignees(value, row):
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lower() == ALL_MEMBERS:
+            return ALL_MEMBERS
+        return [name for name in value.replace(';', ' ').replace(',', ' ').split() if name]
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise TaskImportError(f"row {row}: assignees must be a list of usernames or a string")
+    return [name.strip() for name in value]
+
+
+def parse_tasks(data, fmt):
+    """
+    Rows from CSV or JSON text, as dicts with title, description, week_start,
+    due_at and assignees (a list of usernames, or 'all' for every approved
+    member). CSV takes a header row and space/semicolon-separated assignees;
+    JSON takes a list of objects with the same keys.
+    """
+    if fmt == 'json':
+        try:
+            raw = json.loads(data)
+        except ValueError as exc:
+            raise TaskImportError(f"invalid JSON: {exc}") from None
+        if not isinstance(raw, list) or not all(isinstance(r, dict) for r in raw):
+            raise TaskImportError("JSON must be a list of task objects")
+    elif fmt == 'csv':
+        try:
+            raw = list(csv.DictReader(io.StringIO(data)))
+        except csv.Error as exc:
+            raise TaskImportError(f"invalid CSV: {exc}") from None
+    else:
+        raise TaskImportError(f"unknown format {fmt!r}")
+
+    rows = []
+    for n, r in enumerate(raw, 1):
+        title = _text(r.get('title'), 'title', n)
+        if not title:
+            raise TaskImportError(f"row {n}: title is required")
+        if len(title) > TITLE_MAX_LENGTH:
+            raise TaskImportError(f"row {n}: title is longer than {TITLE_MAX_LENGTH} characters")
+        due_at = _aware(r.get('due_at'), n)
+        week = r.get('week_start') or None
+        try:
+            week_start = parse_date(week) if isinstance(week, str) else None
+        except ValueError:
+            week_start = None
+        if week and week_start is None:
+            raise TaskImportError(f"row {n}: week_start {week!r} is not a date")
+        rows.append({
+            'title': title,
+            'description': _text(r.get('description'), 'description', n),
+            'week_start': monday_of_week(week_start or timezone.localtime(due_at).date()),
+            'due_at': due_at,
+            'assignees': _assignees(r.get('assignees'), n),
+        })
+    return rows
+
+
+@transaction.atomic
+def import_tasks(rows, created_by, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create the tasks in `rows` (see parse_tasks) and their assignments; returns
+    a Counter of rows, tasks_created and assignments_created.
+
+    Usernames are resolved in one query. A task with the same title and week
+    as an existing one is reused, so re-running an import only fills gaps.
+    """
+    stats = Counter(rows=len(rows))
+    names = {name for r in rows if r['assignees'] != ALL_MEMBERS for name in r['assignees']}
+    ids_by_name = dict(User.objects.filter(username__in=names).values_list('username', 'pk'))
+    unknown = sorted(names - set(ids_by_name))
+    if unknown:
+        raise TaskImportError(f"unknown member(s): {', '.join(unknown)}")
+    everyone = approved_member_ids() if any(r['assignees'] == ALL_MEMBERS for r in rows) else []
+
+    def existing():
+        return {(t.title, t.week_start): t for t in Task.objects.filter(
+            title__in={r['title'] for r in rows}, week_start__in={r['week_start'] for r in rows})}
+
+    tasks = existing()
+    missing = {}
+    for r in rows:
+        key = (r['title'], r['week_start'])
+        if key not in tasks and key not in missing:
+            missing[key] = Task(title=r['title'], description=r['description'], week_start=r['week_start'],
+                                due_at=r['due_at'], created_by=created_by)
+    if missing:
+        Task.objects.bulk_create(missing.values(), batch_size=chunk_size)
+        stats['tasks_created'] = len(missing)
+        tasks = existing()
+
+    pairs = {}
+    for r in rows:
+        task = tasks[(r['title'], r['week_start'])]
+        uids = everyone if r['assignees'] == ALL_MEMBERS else [ids_by_name[n] for n in r['assignees']]
+        for uid in uids:
+            pairs[(task.pk, uid)] = task
+    stats['assignments_created'] = create_assignments([(task, uid) for (_, uid), task in pairs.items()], chunk_size)
+    return stats
+
+
+def detect_format(name, data):
+    """'json' or 'csv' from the file name, falling back to sniffing the content."""
+    if name.lower().endswith('.json'):
+        return 'json'
+    if name.lower().endswith('.csv'):
+        return 'csv'
+    return 'json' if data.lstrip().startswith('[') else 'csv'
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_due_at(apps, schema_editor):
+    # Rows created before 0003 have no per-assignment deadline; copy the task's
+    Assignment = apps.get_model('tasksapp', 'Assignment')
+    Task = apps.get_model('tasksapp', 'Task')
+    Assignment.objects.filter(due_at__isnull=True).update(
+        due_at=models.Subquery(Task.objects.filter(pk=models.OuterRef('task_id')).values('due_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasksapp', '0003_assignment_created_at_assignment_due_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(condition=models.Q(('late_penalized', False)), fields=['due_at'], name='assign_unpenalized_due_idx'),
+        ),
+    ]
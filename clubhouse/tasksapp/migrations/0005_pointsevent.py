@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    # Existing totals predate the ledger; record them as one adjustment per member
+    Profile = apps.get_model('accounts', 'Profile')
+    PointsEvent = apps.get_model('tasksapp', 'PointsEvent')
+    PointsEvent.objects.bulk_create(
+        [PointsEvent(user_id=p.user_id, kind='ADJUSTMENT', points=p.points_total,
+                     stars=p.stars_total, note='Opening balance')
+         for p in Profile.objects.exclude(points_total=0, stars_total=0).only('user_id', 'points_total', 'stars_total')],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('tasksapp', '0004_assignment_unpenalized_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('APPROVAL', 'Approval'), ('STAR', 'Star'), ('LATE_PENALTY', 'Late penalty'), ('ADJUSTMENT', 'Admin adjustment')], max_length=16)),
+                ('points', models.IntegerField(default=0)),
+                ('stars', models.IntegerField(default=0)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_events', to='tasksapp.assignment')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='points_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_event_weeks(apps, schema_editor):
+    PointsEvent = apps.get_model('tasksapp', 'PointsEvent')
+    Task = apps.get_model('tasksapp', 'Task')
+    PointsEvent.objects.filter(week_start__isnull=True, assignment__isnull=False).update(
+        week_start=models.Subquery(Task.objects.filter(assignments=models.OuterRef('assignment_id'))
+                                   .values('week_start')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasksapp', '0006_assignment_history_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointsevent',
+            name='week_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='WeeklyScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+                ('stars', models.IntegerField(default=0)),
+                ('approvals', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week_start', '-points'], name='weekly_week_points_idx')],
+                'unique_together': {('user', 'week_start')},
+            },
+        ),
+        migrations.RunPython(backfill_event_weeks, migrations.RunPython.noop),
+    ]
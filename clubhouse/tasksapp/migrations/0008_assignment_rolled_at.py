@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def mark_already_rolled(apps, schema_editor):
+    # Earlier rollovers left no marker; a row with a successor has been rolled
+    Assignment = apps.get_model('tasksapp', 'Assignment')
+    rolled = Assignment.objects.filter(rolled_from=OuterRef('pk'))
+    Assignment.objects.filter(Exists(rolled)).update(
+        rolled_at=Subquery(rolled.order_by('created_at').values('created_at')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasksapp', '0007_weeklyscore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='rolled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(condition=models.Q(('rolled_at__isnull', True)), fields=['due_at'], name='assign_unrolled_due_idx'),
+        ),
+        migrations.RunPython(mark_already_rolled, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasksapp', '0008_assignment_rolled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', 'due_at', 'id'], name='assign_status_due_idx'),
+        ),
+    ]
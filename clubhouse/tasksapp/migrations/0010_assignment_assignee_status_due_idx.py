@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasksapp', '0009_assignment_status_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['assignee', 'status', 'due_at'], name='assign_assignee_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', 'submitted_at', 'id'], name='assign_review_queue_idx'),
+        ),
+    ]
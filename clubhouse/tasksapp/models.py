@@ -1,9 +1,14 @@
 # File: tasksapp/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import date, timedelta
 
+from core import fragments, metrics
+
 POINTS_APPROVED = 10
 POINTS_LATE_PENALTY = -10
 POINTS_PER_STAR = 2
@@ -42,13 +47,36 @@ class Assignment(models.Model):
     points_awarded = models.IntegerField(default=0)
     late_penalized = models.BooleanField(default=False)
     rolled_from = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='rolls')
+    rolled_at = models.DateTimeField(null=True, blank=True)  # set once rolled over to next week
 
     class Meta:
         unique_together = ('task', 'assignee')
+        indexes = [
+            # Overdue sweeper: unpenalized rows ordered by deadline
+            models.Index(fields=['due_at'], condition=models.Q(late_penalized=False),
+                         name='assign_unpenalized_due_idx'),
+            # History keyset pagination walks this ordering
+            models.Index(fields=['-approved_at', '-submitted_at', '-created_at', '-id'],
+                         name='assign_history_idx'),
+            # Rollover: rows not yet carried over to next week
+            models.Index(fields=['due_at'], condition=models.Q(rolled_at__isnull=True),
+                         name='assign_unrolled_due_idx'),
+            # Home board sections page through one status by deadline
+            models.Index(fields=['status', 'due_at', 'id'], name='assign_status_due_idx'),
+            # "My assignments": one member's work by status and deadline
+            models.Index(fields=['assignee', 'status', 'due_at'], name='assign_assignee_status_due_idx'),
+            # Leader review queue: submitted work, oldest first
+            models.Index(fields=['status', 'submitted_at', 'id'], name='assign_review_queue_idx'),
+        ]
 
     def __str__(self):
         return f"{self.task.title} -> {self.assignee.username}"
 
+    @property
+    def cache_tags(self):
+        """Fragment cache tags for this assignment's card (see core.fragments)."""
+        return [f'assignment:{self.pk}', f'task:{self.task_id}', f'member:{self.assignee_id}', 'site']
+
     def save(self, *args, **kwargs):
         # Ensure per-assignment due_at is set (defaults from task on first save)
         if self.due_at is None and self.task_id:
@@ -61,22 +89,48 @@ class Assignment(models.Model):
         self.save()
 
     def approve(self, approver: User):
+        """Approve and credit the assignee; returns False if it was already approved."""
+        from .services import record_points
+        now = timezone.now()
+        points = POINTS_APPROVED + self.stars_awarded * POINTS_PER_STAR
+        with transaction.atomic():
+            # Guarded update: a concurrent approval of the same row credits only once
+            updated = (Assignment.objects
+                       .filter(pk=self.pk)
+                       .exclude(status=self.STATUS_APPROVED)
+                       .update(status=self.STATUS_APPROVED, approved_at=now,
+                               approved_by=approver, points_awarded=points))
+            if not updated:
+                return False
+            record_points([PointsEvent(user_id=self.assignee_id, kind=PointsEvent.KIND_APPROVAL,
+                                       points=points, stars=self.stars_awarded,
+                                       assignment=self, created_by=approver)])
+            fragments.invalidate(f'assignment:{self.pk}', 'assignments')  # update() sends no post_save
+            transaction.on_commit(metrics.APPROVALS.inc)
         self.status = self.STATUS_APPROVED
-        self.approved_at = timezone.now()
+        self.approved_at = now
         self.approved_by = approver
-        base = POINTS_APPROVED
-        bonus = self.stars_awarded * POINTS_PER_STAR
-        self.points_awarded = base + bonus
-        self.save()
-        # update profile totals
-        p = self.assignee.profile
-        p.points_total += self.points_awarded
-        p.stars_total += self.stars_awarded
-        p.save()
+        self.points_awarded = points
+        return True
 
-    def award_star(self):
+    def award_star(self, awarded_by: User = None):
+        """Add a star; if already approved, credit the +2 to the assignee right away."""
+        from .services import record_points
+        with transaction.atomic():
+            credited = (Assignment.objects
+                        .filter(pk=self.pk, status=self.STATUS_APPROVED)
+                        .update(stars_awarded=F('stars_awarded') + 1,
+                                points_awarded=F('points_awarded') + POINTS_PER_STAR))
+            if credited:
+                record_points([PointsEvent(user_id=self.assignee_id, kind=PointsEvent.KIND_STAR,
+                                           points=POINTS_PER_STAR, stars=1,
+                                           assignment=self, created_by=awarded_by)])
+                self.points_awarded += POINTS_PER_STAR
+            else:
+                Assignment.objects.filter(pk=self.pk).update(stars_awarded=F('stars_awarded') + 1)
+            fragments.invalidate(f'assignment:{self.pk}', 'assignments')
+            transaction.on_commit(metrics.STARS.inc)
         self.stars_awarded += 1
-        self.save()
 
     def is_overdue(self):
         """Return True if not approved and past its due time."""
@@ -88,11 +142,66 @@ class Assignment(models.Model):
 
     def apply_late_penalty_once(self):
         """Apply -10 once to the assignee's profile when overdue; no-op if already applied."""
+        from .sweeper import sweep_overdue
         if self.late_penalized:
             return False
-        p = self.assignee.profile
-        p.points_total = (p.points_total or 0) + POINTS_LATE_PENALTY
-        p.save(update_fields=['points_total'])
-        self.late_penalized = True
-        self.save(update_fields=['late_penalized'])
-        return True
+        applied = sweep_overdue(ids=[self.pk]) == 1
+        if applied:
+            self.late_penalized = True
+        return applied
+
+class PointsEvent(models.Model):
+    """Append-only points ledger; Profile.points_total/stars_total are its running sums."""
+    KIND_APPROVAL = 'APPROVAL'
+    KIND_STAR = 'STAR'
+    KIND_LATE_PENALTY = 'LATE_PENALTY'
+    KIND_ADJUSTMENT = 'ADJUSTMENT'
+    KIND_CHOICES = [
+        (KIND_APPROVAL, 'Approval'),
+        (KIND_STAR, 'Star'),
+        (KIND_LATE_PENALTY, 'Late penalty'),
+        (KIND_ADJUSTMENT, 'Admin adjustment'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_events')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    points = models.IntegerField(default=0)
+    stars = models.IntegerField(default=0)
+    assignment = models.ForeignKey(Assignment, null=True, blank=True, on_delete=models.SET_NULL, related_name='points_events')
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Task week the event counts toward (None for adjustments without an assignment)
+    week_start = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'], name='points_user_created_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.points:+d}"
+
+class WeeklyScore(models.Model):
+    """Per-member weekly rollup of the points ledger, keyed by task week (Monday)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_scores')
+    week_start = models.DateField()
+    points = models.IntegerField(default=0)
+    stars = models.IntegerField(default=0)
+    approvals = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'week_start')
+        indexes = [models.Index(fields=['week_start', '-points'], name='weekly_week_points_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} {self.week_start}: {self.points}"
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_fragments(sender, instance, **kwargs):
+    # Card titles, board and history pages, and the leaderboard's "last task" column
+    fragments.invalidate(f'task:{instance.pk}', 'assignments', 'leaderboard')
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def invalidate_assignment_fragments(sender, instance, **kwargs):
+    # queryset.update() sends no signal; cards also vary on status, stars and points
+    fragments.invalidate(f'assignment:{instance.pk}', 'assignments', 'leaderboard')
@@ -0,0 +1,179 @@
+# File: tasksapp/pagination.py
+from functools import reduce
+from operator import and_, or_
+
+from django.core import signing
+from django.db.models import F, Q
+
+CURSOR_SALT = 'tasksapp.keyset'
+
+
+class _Key:
+    """One ordering column: field path, direction and whether it can be NULL."""
+
+    def __init__(self, path, descending, nullable, nulls_first=False):
+        self.path = path
+        self.descending = descending
+        self.nullable = nullable
+        self.nulls_first = nulls_first  # only meaningful when nullable
+
+    def reversed(self):
+        return _Key(self.path, not self.descending, self.nullable, not self.nulls_first)
+
+    def order_by(self):
+        if not self.nullable:
+            return F(self.path).desc() if self.descending else F(self.path).asc()
+        nulls = {'nulls_first': True} if self.nulls_first else {'nulls_last': True}
+        return F(self.path).desc(**nulls) if self.descending else F(self.path).asc(**nulls)
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.path}__isnull': True})
+        return Q(**{self.path: value})
+
+    def strictly_after(self, value):
+        """Rows that sort after `value` on this column alone (None when there are none)."""
+        if value is None:
+            return Q(**{f'{self.path}__isnull': False}) if self.nulls_first else None
+        q = Q(**{f"{self.path}__{'lt' if self.descending else 'gt'}": value})
+        if self.nullable and not self.nulls_first:
+            q |= Q(**{f'{self.path}__isnull': True})
+        return q
+
+    def bound(self, value):
+        """Sargable half-open range for non-NULL rows at or after `value`."""
+        return Q(**{f"{self.path}__{'lte' if self.descending else 'gte'}": value})
+
+
+def _after(keys, values):
+    """Row-value comparison `(keys) > (values)` in ordering terms, NULL-aware."""
+    terms = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        after = key.strictly_after(value)
+        if after is not None:
+            terms.append(reduce(and_, [k.equal(v) for k, v in zip(keys[:i], values[:i])], after))
+    return reduce(or_, terms) if terms else None
+
+
+def _fetch_after(qs, keys, values, limit):
+    """
+    Up to `limit` rows after `values`, walking the ordering index from the cursor.
+
+    The leading column gets a plain range bound so the database can seek
+    instead of scanning; NULLs sit in their own tier and are fetched with a
+    separate query when the current tier runs out.
+    """
+    order = [k.order_by() for k in keys]
+    if values is None:
+        return list(qs.order_by(*order)[:limit])
+    if not keys:
+        return []
+
+    key, value, rest, rest_values = keys[0], values[0], keys[1:], values[1:]
+    is_null = Q(**{f'{key.path}__isnull': True})
+
+    if value is None:
+        # Cursor is inside the NULL tier of this column
+        rows = _fetch_after(qs.filter(is_null), rest, rest_values, limit)
+        if key.nulls_first and len(rows) < limit:
+            rows += list(qs.filter(~is_null).order_by(*order)[:limit - len(rows)])
+        return rows
+
+    ties = _after(rest, rest_values)
+    strict = Q(**{f"{key.path}__{'lt' if key.descending else 'gt'}": value})
+    within = strict | (key.equal(value) & ties) if ties is not None else strict
+    rows = list(qs.filter(key.bound(value)).filter(within).order_by(*order)[:limit])
+    if key.nullable and not key.nulls_first and len(rows) < limit:
+        rows += list(qs.filter(is_null).order_by(*order)[:limit - len(rows)])
+    return rows
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination: every page is a LIMIT query seeded from the
+    previous page's boundary row, so deep pages cost the same as the first and
+    no COUNT(*) is needed. Cursors are opaque, signed tokens.
+
+    `ordering` is a Django-style list such as ['-approved_at', '-id']; it must
+    end in a unique column. NULLs always sort last in the forward direction.
+    """
+
+    def __init__(self, queryset, ordering, per_page=25):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = [self._key(o) for o in ordering]
+
+    def _field(self, path):
+        model, field = self.queryset.model, None
+        for part in path.split('__'):
+            field = model._meta.get_field(part)
+            model = field.related_model or model
+        return field
+
+    def _key(self, spec):
+        path = spec.lstrip('-')
+        return _Key(path, spec.startswith('-'), self._field(path).null)
+
+    def _values(self, obj):
+        values = []
+        for key in self.keys:
+            value = obj
+            for part in key.path.split('__'):
+                value = getattr(value, part)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def _encode(self, direction, obj):
+        return signing.dumps({'d': direction, 'k': self._values(obj)}, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+            direction, raw = payload['d'], payload['k']
+        except (signing.BadSignature, KeyError, TypeError):
+            return 'n', None
+        if direction not in ('n', 'p') or len(raw) != len(self.keys):
+            return 'n', None
+        values = [None if value is None else self._field(key.path).to_python(value)
+                  for key, value in zip(self.keys, raw)]
+        return direction, values
+
+    def page(self, cursor=None):
+        direction, values = self._decode(cursor) if cursor else ('n', None)
+        keys = self.keys if direction == 'n' else [k.reversed() for k in self.keys]
+        rows = _fetch_after(self.queryset, keys, values, self.per_page + 1)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'p':
+            rows.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, values is not None
+        if not rows:
+            return KeysetPage([])
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode('n', rows[-1]) if has_next else None,
+            previous_cursor=self._encode('p', rows[0]) if has_previous else None,
+        )
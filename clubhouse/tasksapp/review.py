@@ -0,0 +1,72 @@
+# File: tasksapp/review.py
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import fragments, metrics
+from .claims import ClaimLost, retrying
+from .models import Assignment, PointsEvent, POINTS_APPROVED, POINTS_PER_STAR
+from .services import record_points
+
+OPEN_STATUSES = [Assignment.STATUS_ASSIGNED, Assignment.STATUS_SUBMITTED]
+
+
+def _approve_batch(pks, approver):
+    rows = list(Assignment.objects.select_for_update()
+                .filter(pk__in=pks, status__in=OPEN_STATUSES)
+                .values_list('pk', 'assignee_id', 'stars_awarded', 'task__week_start'))
+    if not rows:
+        return []
+    ids = [pk for pk, _, _, _ in rows]
+    claimed = (Assignment.objects
+               .filter(pk__in=ids, status__in=OPEN_STATUSES)
+               .update(status=Assignment.STATUS_APPROVED, approved_at=timezone.now(), approved_by=approver,
+                       points_awarded=POINTS_APPROVED + F('stars_awarded') * POINTS_PER_STAR))
+    if claimed != len(ids):
+        raise ClaimLost()
+    record_points([PointsEvent(user_id=uid, kind=PointsEvent.KIND_APPROVAL,
+                               points=POINTS_APPROVED + stars * POINTS_PER_STAR, stars=stars,
+                               assignment_id=pk, created_by=approver, week_start=week)
+                   for pk, uid, stars, week in rows])
+    fragments.invalidate(*[f'assignment:{pk}' for pk in ids], 'assignments')
+    transaction.on_commit(lambda: metrics.APPROVALS.inc(len(ids)))
+    return ids
+
+
+def approve_assignments(pks, approver):
+    """
+    Approve every open assignment among `pks` in one transaction; returns the
+    ids approved. Already-approved rows are skipped, so a repeated request
+    credits nobody twice. Ledger, profile and weekly totals are written with
+    one grouped record_points call.
+    """
+    return retrying(lambda: _approve_batch(pks, approver))
+
+
+def _star_batch(pks, awarded_by):
+    rows = list(Assignment.objects.select_for_update()
+                .filter(pk__in=pks)
+                .values_list('pk', 'assignee_id', 'status', 'task__week_start'))
+    approved = [r for r in rows if r[2] == Assignment.STATUS_APPROVED]
+    pending = [r[0] for r in rows if r[2] != Assignment.STATUS_APPROVED]
+    # Approved work is credited right away; an approval later counts the star
+    credited = (Assignment.objects
+                .filter(pk__in=[r[0] for r in approved])
+                .update(stars_awarded=F('stars_awarded') + 1, points_awarded=F('points_awarded') + POINTS_PER_STAR))
+    uncredited = (Assignment.objects
+                  .filter(pk__in=pending)
+                  .exclude(status=Assignment.STATUS_APPROVED)
+                  .update(stars_awarded=F('stars_awarded') + 1))
+    if credited + uncredited != len(rows):
+        raise ClaimLost()
+    record_points([PointsEvent(user_id=uid, kind=PointsEvent.KIND_STAR, points=POINTS_PER_STAR, stars=1,
+                               assignment_id=pk, created_by=awarded_by, week_start=week)
+                   for pk, uid, _, week in approved])
+    fragments.invalidate(*[f'assignment:{r[0]}' for r in rows], 'assignments')
+    transaction.on_commit(lambda: metrics.STARS.inc(len(rows)))
+    return [r[0] for r in rows]
+
+
+def star_assignments(pks, awarded_by):
+    """Add one star to each of `pks` in one transaction; returns the ids starred."""
+    return retrying(lambda: _star_batch(pks, awarded_by))
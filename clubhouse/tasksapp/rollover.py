@@ -0,0 +1,130 @@
+# File: tasksapp/rollover.py
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import fragments, metrics
+from .claims import ClaimLost
+from .models import Assignment, Task
+from .sweeper import sweep_overdue
+
+ROLLOVER_CHUNK_SIZE = 1000
+
+
+def rollover_candidates(now=None):
+    """Assignments past their due time, not approved, and not yet rolled over."""
+    now = now or timezone.now()
+    return (Assignment.objects
+            .filter(rolled_at__isnull=True, due_at__lt=now)
+            .exclude(status=Assignment.STATUS_APPROVED))
+
+
+def _weeks_ahead(due_at, now):
+    """Whole weeks to move a deadline so it lands after `now` (at least one)."""
+    return max(1, (now - due_at) // timedelta(weeks=1) + 1)
+
+
+def _successor_key(r, now):
+    return (r['task__title'], r['task__description'],
+            r['task__week_start'] + timedelta(weeks=_weeks_ahead(r['task__due_at'], now)))
+
+
+def _successor_tasks(rows, now, stats):
+    """
+    Map each row's task key to its next copy, bulk-creating the missing ones.
+    The copy is the first weekly one still open at `now`, so a row overdue
+    for several weeks is not rolled into a task that is overdue already.
+    """
+    wanted = {}
+    for r in rows:
+        wanted.setdefault(_successor_key(r, now), r)
+
+    def existing():
+        found = {}
+        for t in (Task.objects
+                  .filter(week_start__in={k[2] for k in wanted}, title__in={k[0] for k in wanted})
+                  .order_by('pk')
+                  .only('pk', 'title', 'description', 'week_start', 'due_at')):
+            found.setdefault((t.title, t.description, t.week_start), t)
+        return found
+
+    tasks = existing()
+    missing = [Task(title=title, description=description, week_start=week,
+                    due_at=r['task__due_at'] + timedelta(weeks=_weeks_ahead(r['task__due_at'], now)),
+                    created_by_id=r['task__created_by_id'])
+               for (title, description, week), r in wanted.items() if (title, description, week) not in tasks]
+    if missing:
+        Task.objects.bulk_create(missing)
+        stats['tasks_created'] += len(missing)
+        tasks = existing()
+    return tasks
+
+
+def _roll_chunk(now, rows, stats):
+    # Claim the rows; the rolled_at guard makes a concurrent run visible
+    pks = [r['pk'] for r in rows]
+    claimed = Assignment.objects.filter(pk__in=pks, rolled_at__isnull=True).update(rolled_at=now)
+    if claimed != len(pks):
+        raise ClaimLost()
+
+    tasks = _successor_tasks(rows, now, stats)
+    new_rows = []
+    for r in rows:
+        task = tasks[_successor_key(r, now)]
+        # bulk_create skips Assignment.save(), so copy the task deadline here
+        new_rows.append(Assignment(task_id=task.pk, assignee_id=r['assignee_id'],
+                                   rolled_from_id=r['pk'], due_at=task.due_at))
+    before = Assignment.objects.filter(rolled_from_id__in=pks).count()
+    Assignment.objects.bulk_create(new_rows, ignore_conflicts=True)
+    fragments.invalidate('assignments', 'leaderboard')  # bulk_create sends no post_save
+    stats['assignments_created'] += Assignment.objects.filter(rolled_from_id__in=pks).count() - before
+
+    # Rows the sweeper already penalized are skipped, so nobody pays twice
+    stats['penalized'] += sweep_overdue(now=now, batch_size=len(pks), ids=pks)
+    stats['rolled'] += len(rows)
+    transaction.on_commit(lambda: metrics.ROLLOVER_BATCH.observe(len(rows)))
+
+
+def rollover(now=None, chunk_size=ROLLOVER_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Carry every overdue, unapproved assignment over to next week's copy of its
+    task and apply the late penalty once; returns a Counter of what was done.
+
+    Work is committed chunk by chunk and each rolled row is stamped with
+    rolled_at in the same transaction, so the stamp is the checkpoint: an
+    interrupted run picks up where it stopped and a repeated run does nothing.
+    With dry_run=True every chunk is rolled back. `progress` is called with
+    the running stats after each chunk.
+
+    Only rows that were candidates when the run started are rolled; the
+    successors it creates are never picked up again by the same run.
+    """
+    now = now or timezone.now()
+    stats = Counter()
+    last_pk = 0
+    max_pk = rollover_candidates(now).aggregate(Max('pk'))['pk__max']
+    if max_pk is None:
+        return stats
+    while True:
+        rows = list(rollover_candidates(now)
+                    .filter(pk__gt=last_pk, pk__lte=max_pk)
+                    .order_by('pk')
+                    .values('pk', 'assignee_id', 'task__title', 'task__description',
+                            'task__week_start', 'task__due_at', 'task__created_by_id')[:chunk_size])
+        if not rows:
+            return stats
+        chunk_stats = Counter()
+        try:
+            with transaction.atomic():
+                _roll_chunk(now, rows, chunk_stats)
+                if dry_run:
+                    transaction.set_rollback(True)
+        except ClaimLost:
+            continue  # another run took some of these rows; re-read them
+        stats.update(chunk_stats)
+        last_pk = rows[-1]['pk']
+        if progress:
+            progress(stats, last_pk)
@@ -0,0 +1,154 @@
+# File: tasksapp/selectors.py
+from django.contrib.auth.models import User
+from django.db.models import Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Assignment, WeeklyScore
+
+
+def _latest_assignment(status, *ordering):
+    """Correlated subquery: id of the member's most recent assignment in `status`."""
+    return Subquery(Assignment.objects
+                    .filter(assignee=OuterRef('pk'), status=status)
+                    .order_by(*ordering)
+                    .values('pk')[:1])
+
+
+# Everything tasksapp/_card.html renders; other columns are never loaded
+CARD_FIELDS = ('status', 'stars_awarded', 'points_awarded', 'due_at', 'approved_at', 'assignee__username',
+               'task__title', 'task__description', 'task__due_at')
+
+
+def card_queryset():
+    """Assignments with just the columns a board card (and its cursor) needs."""
+    return (Assignment.objects
+            .select_related('task', 'assignee')
+            .only(*CARD_FIELDS))
+
+
+# Section -> keyset ordering (ends in a unique column); soonest deadline first
+# for open work, newest first for finished or missed work
+BOARD_ORDERING = {
+    'assigned': ['due_at', 'id'],
+    'submitted': ['due_at', 'id'],
+    'approved': ['-approved_at', '-id'],
+    'overdue': ['-due_at', '-id'],
+}
+
+
+def board_cards(section, now, week_start, assignee=None):
+    """
+    Cards for one home board section, optionally only one member's.
+
+    Assigned holds work that can still be submitted; once past due it moves
+    to Overdue (with late submissions still waiting for approval). Approved
+    is limited to tasks of `week_start`, so no section grows with history.
+    """
+    qs = card_queryset()
+    if assignee is not None:
+        qs = qs.filter(assignee=assignee)  # served by assign_assignee_status_due_idx
+    if section == 'assigned':
+        return qs.filter(status=Assignment.STATUS_ASSIGNED, due_at__gte=now)
+    if section == 'submitted':
+        return qs.filter(status=Assignment.STATUS_SUBMITTED)
+    if section == 'approved':
+        return qs.filter(status=Assignment.STATUS_APPROVED, task__week_start=week_start)
+    if section == 'overdue':
+        # Spelled as IN rather than excluding APPROVED so the status indexes apply
+        return qs.filter(status__in=[Assignment.STATUS_ASSIGNED, Assignment.STATUS_SUBMITTED], due_at__lt=now)
+    raise ValueError(f"Unknown board section: {section}")
+
+
+def next_deadline(now):
+    """
+    Earliest deadline after `now` among open assignments, or None: until then
+    no card changes section or expires on its own.
+    """
+    return (Assignment.objects
+            .filter(status__in=[Assignment.STATUS_ASSIGNED, Assignment.STATUS_SUBMITTED], due_at__gt=now)
+            .aggregate(next=Min('due_at'))['next'])
+
+
+REVIEW_ORDERING = ['submitted_at', 'id']
+
+
+def review_queue():
+    """Submitted work waiting for the leader, longest-waiting first."""
+    return card_queryset().filter(status=Assignment.STATUS_SUBMITTED)
+
+
+LEADERBOARD_ORDERING = ['-profile__points_total', 'username']
+
+
+def leaderboard_queryset():
+    """Active members with profile and last-activity assignment id, best first."""
+    return (User.objects
+            .filter(is_active=True)
+            .select_related('profile')
+            .annotate(last_assignment_id=Coalesce(
+                _latest_assignment(Assignment.STATUS_APPROVED, '-approved_at'),
+                _latest_assignment(Assignment.STATUS_SUBMITTED, '-submitted_at'),
+                _latest_assignment(Assignment.STATUS_ASSIGNED, '-task__due_at', '-id'),
+            ))
+            .order_by(*LEADERBOARD_ORDERING))
+
+
+def leaderboard_rows(users=None):
+    """
+    Total points plus last activity for every active member (or just `users`,
+    e.g. one page of leaderboard_queryset()), in two queries.
+
+    Last activity prefers the most recent APPROVED assignment, then SUBMITTED,
+    then ASSIGNED (by due time). The user query resolves which assignment that
+    is per member; a single follow-up query loads those assignments.
+    """
+    if users is None:
+        users = list(leaderboard_queryset())
+
+    last_ids = {u.last_assignment_id for u in users if u.last_assignment_id}
+    last_by_id = (Assignment.objects
+                  .select_related('task')
+                  .only('status', 'approved_at', 'submitted_at', 'points_awarded',
+                        'task__title', 'task__due_at')
+                  .in_bulk(last_ids))
+
+    rows = []
+    for u in users:
+        last = last_by_id.get(u.last_assignment_id)
+        row = {
+            'user': u,
+            'points_total': getattr(getattr(u, 'profile', None), 'points_total', 0) or 0,
+            'last_task_title': None,
+            'last_points': 0,
+            'last_when': None,
+            'last_status': None,
+        }
+        if last:
+            row['last_task_title'] = last.task.title
+            if last.status == Assignment.STATUS_APPROVED:
+                row['last_status'] = 'approved'
+                row['last_when'] = last.approved_at
+                row['last_points'] = last.points_awarded or 0
+            elif last.status == Assignment.STATUS_SUBMITTED:
+                row['last_status'] = 'submitted'
+                row['last_when'] = last.submitted_at
+            else:
+                row['last_status'] = 'assigned'
+                row['last_when'] = last.task.due_at
+        rows.append(row)
+    return rows
+
+
+def weekly_scores(week_start):
+    """A week's WeeklyScore rows for members with approved work, best first."""
+    return (WeeklyScore.objects
+            .filter(week_start=week_start, approvals__gt=0)
+            .select_related('user')
+            .order_by('-points', 'user__username'))
+
+
+def weekly_top(week_start, limit=5):
+    """(top_points, top_stars) lists of (user, value) pairs for one week."""
+    rows = list(weekly_scores(week_start))
+    top_points = [(r.user, r.points) for r in rows[:limit]]
+    top_stars = [(r.user, r.stars) for r in sorted(rows, key=lambda r: r.stars, reverse=True)[:limit]]
+    return top_points, top_stars
@@ -0,0 +1,194 @@
+# File: tasksapp/services.py
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from accounts.middleware import forget_members
+from core import fragments
+from accounts.models import Profile
+from .models import Assignment, PointsEvent, WeeklyScore, POINTS_LATE_PENALTY
+
+RECONCILE_CHUNK_SIZE = 500
+
+
+def _keys_q(keys, key_fields):
+    """Q matching any of `keys`: an IN on the first field per distinct rest-of-key."""
+    first, *rest = key_fields
+    groups = defaultdict(list)
+    for key in keys:
+        groups[key[1:]].append(key[0])
+    return reduce(or_, [Q(**{f'{first}__in': firsts}, **dict(zip(rest, others)))
+                        for others, firsts in groups.items()])
+
+
+def _summed(deltas, index, *key_fields):
+    """
+    Per-row increment for column `index` of `deltas`, keyed on `key_fields`.
+
+    Keys sharing an increment collapse into one WHEN ... IN (...) branch, so a
+    batch of identical penalties compiles to a single branch, not one per row.
+    """
+    by_value = defaultdict(list)
+    for key, d in deltas.items():
+        by_value[d[index]].append(key)
+    if len(by_value) == 1:
+        (value,) = by_value
+        return Value(value)
+    return Case(*[When(_keys_q(keys, key_fields), then=Value(value)) for value, keys in by_value.items()],
+                default=Value(0))
+
+
+def _fill_weeks(events):
+    """Default each event's week_start to its assignment's task week (one query)."""
+    missing = {e.assignment_id for e in events if e.week_start is None and e.assignment_id}
+    if not missing:
+        return
+    weeks = dict(Assignment.objects.filter(pk__in=missing).values_list('pk', 'task__week_start'))
+    for e in events:
+        if e.week_start is None and e.assignment_id:
+            e.week_start = weeks.get(e.assignment_id)
+
+
+def _apply_weekly(events):
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for e in events:
+        if e.week_start is None:
+            continue
+        d = deltas[(e.user_id, e.week_start)]
+        d[0] += e.points
+        d[1] += e.stars
+        d[2] += 1 if e.kind == PointsEvent.KIND_APPROVAL else 0
+    if not deltas:
+        return
+    WeeklyScore.objects.bulk_create([WeeklyScore(user_id=uid, week_start=week) for uid, week in deltas],
+                                    ignore_conflicts=True)
+    key_fields = ('user_id', 'week_start')
+    WeeklyScore.objects.filter(_keys_q(deltas, key_fields)).update(
+        points=F('points') + _summed(deltas, 0, *key_fields),
+        stars=F('stars') + _summed(deltas, 1, *key_fields),
+        approvals=F('approvals') + _summed(deltas, 2, *key_fields),
+    )
+
+
+@transaction.atomic
+def record_points(events):
+    """
+    Append unsaved PointsEvents to the ledger and fold them into Profile totals
+    and the WeeklyScore rollup.
+
+    This is the only place profile totals change: the totals are bumped with
+    F() expressions, so concurrent writers never lose each other's updates.
+    """
+    events = [e for e in events if e.points or e.stars or e.kind == PointsEvent.KIND_APPROVAL]
+    if not events:
+        return []
+    _fill_weeks(events)
+    PointsEvent.objects.bulk_create(events)
+
+    deltas = defaultdict(lambda: [0, 0])
+    for e in events:
+        deltas[(e.user_id,)][0] += e.points
+        deltas[(e.user_id,)][1] += e.stars
+    Profile.objects.filter(user_id__in=[uid for uid, in deltas]).update(
+        points_total=F('points_total') + _summed(deltas, 0, 'user_id'),
+        stars_total=F('stars_total') + _summed(deltas, 1, 'user_id'),
+    )
+    _apply_weekly(events)
+    forget_members(*[uid for uid, in deltas])
+    fragments.invalidate('leaderboard')
+    return events
+
+
+def adjust_points(user, points=0, stars=0, actor=None, note=''):
+    """Admin adjustment of a member's totals, recorded in the ledger."""
+    return record_points([PointsEvent(user=user, kind=PointsEvent.KIND_ADJUSTMENT,
+                                      points=points, stars=stars, created_by=actor, note=note)])
+
+
+def reconcile_profile_totals(chunk_size=RECONCILE_CHUNK_SIZE, fix=False):
+    """
+    Compare every profile's totals with the ledger; returns the drifted rows.
+
+    Profiles are walked in user_id order, one aggregate query per chunk, so the
+    ledger is summed in a single pass. With fix=True drifted totals are
+    rewritten from the ledger.
+    """
+    drift = []
+    last_user_id = 0
+    while True:
+        chunk = list(Profile.objects
+                     .filter(user_id__gt=last_user_id)
+                     .order_by('user_id')
+                     .values_list('pk', 'user_id', 'points_total', 'stars_total')[:chunk_size])
+        if not chunk:
+            return drift
+        last_user_id = chunk[-1][1]
+
+        sums = {row['user_id']: (row['points'] or 0, row['stars'] or 0)
+                for row in (PointsEvent.objects
+                            .filter(user_id__in=[uid for _, uid, _, _ in chunk])
+                            .values('user_id')
+                            .annotate(points=Sum('points'), stars=Sum('stars')))}
+        stale = []
+        for pk, uid, points_total, stars_total in chunk:
+            points, stars = sums.get(uid, (0, 0))
+            if (points, stars) != (points_total, stars_total):
+                drift.append({'user_id': uid, 'points_total': points_total, 'ledger_points': points,
+                              'stars_total': stars_total, 'ledger_stars': stars})
+                stale.append(Profile(pk=pk, user_id=uid, points_total=points, stars_total=stars))
+        if fix and stale:
+            Profile.objects.bulk_update(stale, ['points_total', 'stars_total'])
+            forget_members(*[p.user_id for p in stale])
+            fragments.invalidate('leaderboard')
+
+
+@transaction.atomic
+def rebuild_weekly_scores(batch_size=RECONCILE_CHUNK_SIZE):
+    """
+    Recompute the WeeklyScore rollup from scratch; returns the number of rows written.
+
+    Sources are the ledger (events carrying a week) plus approvals and late
+    penalties recorded on assignments before the ledger existed.
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+
+    for row in (PointsEvent.objects
+                .filter(week_start__isnull=False)
+                .values('user_id', 'week_start')
+                .annotate(points=Sum('points'), stars=Sum('stars'),
+                          approvals=Count('pk', filter=Q(kind=PointsEvent.KIND_APPROVAL)))):
+        t = totals[(row['user_id'], row['week_start'])]
+        t[0] += row['points'] or 0
+        t[1] += row['stars'] or 0
+        t[2] += row['approvals']
+
+    legacy_approved = (Assignment.objects
+                       .filter(status=Assignment.STATUS_APPROVED)
+                       .exclude(points_events__kind=PointsEvent.KIND_APPROVAL)
+                       .values('assignee_id', 'task__week_start')
+                       .annotate(points=Sum('points_awarded'), stars=Sum('stars_awarded'), approvals=Count('pk')))
+    for row in legacy_approved:
+        t = totals[(row['assignee_id'], row['task__week_start'])]
+        t[0] += row['points'] or 0
+        t[1] += row['stars'] or 0
+        t[2] += row['approvals']
+
+    legacy_penalized = (Assignment.objects
+                        .filter(late_penalized=True)
+                        .exclude(points_events__kind=PointsEvent.KIND_LATE_PENALTY)
+                        .values('assignee_id', 'task__week_start')
+                        .annotate(count=Count('pk')))
+    for row in legacy_penalized:
+        totals[(row['assignee_id'], row['task__week_start'])][0] += row['count'] * POINTS_LATE_PENALTY
+
+    WeeklyScore.objects.all().delete()
+    WeeklyScore.objects.bulk_create(
+        [WeeklyScore(user_id=uid, week_start=week, points=p, stars=st, approvals=n)
+         for (uid, week), (p, st, n) in totals.items()],
+        batch_size=batch_size,
+    )
+    fragments.invalidate('leaderboard')
+    return len(totals)
@@ -0,0 +1,101 @@
+# File: tasksapp/sweeper.py
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core import metrics
+from .claims import ClaimLost, retrying
+from .models import Assignment, PointsEvent, POINTS_LATE_PENALTY
+from .services import record_points
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+
+def overdue_unpenalized(now=None):
+    """Assignments past their due time, not approved, and not yet penalized."""
+    now = now or timezone.now()
+    return (Assignment.objects
+            .filter(late_penalized=False, due_at__lt=now)
+            .exclude(status=Assignment.STATUS_APPROVED))
+
+
+def _sweep_batch(now, batch_size, ids):
+    qs = overdue_unpenalized(now)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    rows = list(qs.select_for_update(skip_locked=True)
+                  .order_by('due_at', 'pk')
+                  .values_list('pk', 'assignee_id')[:batch_size])
+    if not rows:
+        return 0
+
+    # Claim the rows; the late_penalized guard makes a concurrent claim visible
+    pks = [pk for pk, _ in rows]
+    claimed = (Assignment.objects
+               .filter(pk__in=pks, late_penalized=False)
+               .update(late_penalized=True))
+    if claimed != len(pks):
+        raise ClaimLost()
+
+    record_points([PointsEvent(user_id=uid, kind=PointsEvent.KIND_LATE_PENALTY,
+                               points=POINTS_LATE_PENALTY, assignment_id=pk)
+                   for pk, uid in rows])
+    transaction.on_commit(lambda: metrics.LATE_PENALTIES.inc(len(rows)))
+    return len(rows)
+
+
+def sweep_overdue(now=None, batch_size=SWEEP_BATCH_SIZE, ids=None):
+    """
+    Apply the late penalty once to every overdue assignment; returns how many were penalized.
+
+    Each batch claims its rows and records their ledger events in one transaction,
+    so the sweep is idempotent and safe to run from several processes at once.
+    Pass `ids` to restrict the sweep to specific assignments.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        done = retrying(lambda: _sweep_batch(now, batch_size, ids))
+        total += done
+        if done < batch_size:
+            return total
+
+
+_runner = None
+
+
+def start_periodic_sweeper(interval):
+    """Run sweep_overdue every `interval` seconds on a daemon thread (once per process)."""
+    global _runner
+    if _runner is not None:
+        return _runner
+
+    def run():
+        while True:
+            try:
+                swept = sweep_overdue()
+                if swept:
+                    logger.info("Overdue sweep penalized %s assignment(s)", swept)
+            except Exception:
+                logger.exception("Overdue sweep failed")
+            finally:
+                close_old_connections()
+            time.sleep(interval)
+
+    _runner = threading.Thread(target=run, name='overdue-sweeper', daemon=True)
+    _runner.start()
+    return _runner
+
+
+def start_sweeper_from_settings():
+    """Start the periodic sweeper when OVERDUE_SWEEP_INTERVAL is a positive number of seconds."""
+    interval = getattr(settings, 'OVERDUE_SWEEP_INTERVAL', 0)
+    if interval and interval > 0:
+        return start_periodic_sweeper(interval)
+    return None
@@ -1,3 +1,745 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import metrics
+from .models import Task, Assignment, PointsEvent, WeeklyScore, monday_of_week
+from .pagination import KeysetPaginator
+from .rollover import rollover
+from .selectors import leaderboard_rows
+from .services import rebuild_weekly_scores, reconcile_profile_totals
+from .sweeper import sweep_overdue
+from .views import HISTORY_ORDERING
+
+
+def make_member(username, **extra):
+    user = User.objects.create(username=username, **extra)
+    user.profile.is_approved = True
+    user.profile.save()
+    return user
+
+
+def make_task(creator, title='Chore', due_in=timedelta(days=2)):
+    due = timezone.now() + due_in
+    return Task.objects.create(title=title, week_start=monday_of_week(due.date()),
+                               due_at=due, created_by=creator)
+
+
+class LeaderboardRowsTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+
+    def add_members(self, count, offset=0):
+        for i in range(offset, offset + count):
+            u = make_member(f'member{i}')
+            Assignment.objects.create(task=make_task(self.leader, f'Assigned {i}'), assignee=u)
+            submitted = Assignment.objects.create(task=make_task(self.leader, f'Submitted {i}'), assignee=u)
+            submitted.mark_submitted()
+            approved = Assignment.objects.create(task=make_task(self.leader, f'Approved {i}'), assignee=u)
+            approved.approve(self.leader)
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def test_prefers_approved_then_submitted_then_assigned(self):
+        only_assigned = make_member('assigned_only')
+        a = Assignment.objects.create(task=make_task(self.leader, 'Dishes'), assignee=only_assigned)
+        only_submitted = make_member('submitted_only')
+        s = Assignment.objects.create(task=make_task(self.leader, 'Laundry'), assignee=only_submitted)
+        s.mark_submitted()
+        self.add_members(1)
+
+        rows = {r['user'].username: r for r in leaderboard_rows()}
+        self.assertEqual(rows['assigned_only']['last_status'], 'assigned')
+        self.assertEqual(rows['assigned_only']['last_when'], a.task.due_at)
+        self.assertEqual(rows['submitted_only']['last_status'], 'submitted')
+        self.assertEqual(rows['submitted_only']['last_task_title'], 'Laundry')
+        self.assertEqual(rows['member0']['last_status'], 'approved')
+        self.assertEqual(rows['member0']['last_task_title'], 'Approved 0')
+        self.assertEqual(rows['member0']['last_points'], 10)
+        self.assertIsNone(rows['leader']['last_status'])
+
+    def test_query_count_is_flat_as_membership_grows(self):
+        self.add_members(2)
+        small = self.count_queries(leaderboard_rows)
+        self.add_members(10, offset=2)
+        large = self.count_queries(leaderboard_rows)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 2)
+
+    def test_home_query_count_is_flat_as_membership_grows(self):
+        self.client.force_login(self.leader)
+        self.client.get(reverse('tasksapp:home'))  # warm the session
+        self.add_members(2)
+        small = self.count_queries(lambda: self.client.get(reverse('tasksapp:home')))
+        self.add_members(10, offset=2)
+        large = self.count_queries(lambda: self.client.get(reverse('tasksapp:home')))
+        self.assertEqual(small, large)
+
+
+class HomeBoardTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.member = make_member('sam')
+        self.client.force_login(self.leader)
+
+    def add_cards(self, count, due_in=timedelta(days=2)):
+        member = make_member(f'member{User.objects.count()}')
+        tasks = [make_task(self.leader, f'Chore {i}', due_in=due_in) for i in range(count)]
+        return [Assignment.objects.create(task=t, assignee=member) for t in tasks]
+
+    def test_sections_split_by_status_and_deadline(self):
+        late = Assignment.objects.create(task=make_task(self.leader, 'Late', due_in=timedelta(hours=-1)),
+                                         assignee=self.member)
+        open_ = Assignment.objects.create(task=make_task(self.leader, 'Open'), assignee=self.member)
+        sent = Assignment.objects.create(task=make_task(self.leader, 'Sent'), assignee=self.member)
+        sent.mark_submitted()
+        this_week = Task.objects.create(title='Done', week_start=monday_of_week(date.today()),
+                                        due_at=timezone.now() + timedelta(hours=1), created_by=self.leader)
+        done = Assignment.objects.create(task=this_week, assignee=self.member)
+        done.approve(self.leader)
+
+        sections = self.client.get(reverse('tasksapp:home')).context['sections']
+        self.assertEqual({s['name']: [a.pk for a in s['page']] for s in sections},
+                         {'assigned': [open_.pk], 'submitted': [sent.pk], 'approved': [done.pk],
+                          'overdue': [late.pk]})
+        last_week = monday_of_week(date.today()) - timedelta(days=7)
+        older = self.client.get(reverse('tasksapp:board_section', args=['approved']),
+                                {'week': last_week.isoformat()})
+        self.assertNotContains(older, f'id="a-{done.pk}"')
+        self.assertEqual(self.client.get(reverse('tasksapp:board_section', args=['nope'])).status_code, 404)
+
+    def test_home_payload_does_not_grow_with_history(self):
+        self.add_cards(3)
+        self.client.get(reverse('tasksapp:home'))  # warm the session
+        small = self.client.get(reverse('tasksapp:home'))
+        self.add_cards(40)
+        self.add_cards(40, due_in=timedelta(days=-30))
+        with CaptureQueriesContext(connection) as ctx:
+            large = self.client.get(reverse('tasksapp:home'))
+        self.assertLessEqual(len(ctx.captured_queries), 5)  # sections + ETag deadline
+        cards = large.content.decode().count('class="card"')
+        self.assertEqual(cards, 2 * 10)  # a first page of assigned and of overdue
+        self.assertContains(large, 'hx-trigger="intersect once"', count=2)
+        self.assertNotContains(small, 'hx-trigger="intersect once"')
+
+    def test_infinite_scroll_walks_every_card_once(self):
+        cards = self.add_cards(23)
+        url = reverse('tasksapp:board_section', args=['assigned'])
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(url, {'cursor': cursor} if cursor else {})
+            page = response.context['page_obj']
+            seen += [a.pk for a in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [a.pk for a in cards])
+
+    def test_leaderboard_is_lazy_and_paginated(self):
+        home = self.client.get(reverse('tasksapp:home'))
+        self.assertNotContains(home, 'Leaderboard — All Members')
+        for i in range(30):
+            make_member(f'member{i:02d}')
+        first = self.client.get(reverse('tasksapp:leaderboard'))
+        self.assertContains(first, 'Top Points')
+        self.assertEqual(len(first.context['leaderboard_all']), 25)
+        rest = self.client.get(reverse('tasksapp:leaderboard'), {'cursor': first.context['page_obj'].next_cursor})
+        self.assertNotContains(rest, 'Top Points')
+        self.assertEqual(len(rest.context['leaderboard_all']), 32 - 25)
+
+
+class MyAssignmentsTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.member = make_member('sam')
+        self.other = make_member('alex')
+
+    def test_dashboard_shows_only_my_work_at_flat_cost(self):
+        mine = Assignment.objects.create(task=make_task(self.leader, 'Mine'), assignee=self.member)
+        theirs = Assignment.objects.create(task=make_task(self.leader, 'Theirs'), assignee=self.other)
+        self.client.force_login(self.member)
+        self.client.get(reverse('tasksapp:my_assignments'))  # warm the session
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('tasksapp:my_assignments'))
+        self.assertContains(response, f'id="a-{mine.pk}"')
+        self.assertNotContains(response, f'id="a-{theirs.pk}"')
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+        page = self.client.get(reverse('tasksapp:my_section', args=['assigned'])).context['page_obj']
+        self.assertEqual([a.pk for a in page], [mine.pk])
+
+    def test_member_sections_use_the_assignee_index(self):
+        from .selectors import board_cards
+        qs = board_cards('assigned', timezone.now(), monday_of_week(date.today()), assignee=self.member)
+        self.assertIn('assign_assignee_status_due_idx', qs.order_by('due_at', 'id').explain())
+
+    def test_review_queue_is_for_leaders_oldest_first(self):
+        first = Assignment.objects.create(task=make_task(self.leader, 'First'), assignee=self.member)
+        second = Assignment.objects.create(task=make_task(self.leader, 'Second', due_in=timedelta(hours=1)),
+                                           assignee=self.other)
+        first.mark_submitted()
+        second.mark_submitted()
+        Assignment.objects.create(task=make_task(self.leader, 'Open'), assignee=self.other)
+
+        self.client.force_login(self.member)
+        self.assertRedirects(self.client.get(reverse('tasksapp:review')), reverse('tasksapp:home'))
+        self.client.force_login(self.leader)
+        page = self.client.get(reverse('tasksapp:review')).context['page_obj']
+        self.assertEqual([a.pk for a in page], [first.pk, second.pk])
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.client.force_login(self.leader)
+
+    def submitted(self, count):
+        members = [make_member(f'member{User.objects.count()}') for _ in range(count)]
+        rows = [Assignment.objects.create(task=make_task(self.leader, f'Chore {i}'), assignee=m)
+                for i, m in enumerate(members)]
+        for a in rows:
+            a.mark_submitted()
+        return rows
+
+    def bulk(self, action, rows):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('tasksapp:assignment_bulk'),
+                                        {'action': action, 'ids': [a.pk for a in rows]}, HTTP_HX_REQUEST='true')
+        return response, len(ctx.captured_queries)
+
+    def test_bulk_approve_is_one_batch_with_flat_cost(self):
+        self.client.get(reverse('tasksapp:review'))  # warm the session
+        few, few_queries = self.bulk('approve', self.submitted(2))
+        rows = self.submitted(12)
+        many, many_queries = self.bulk('approve', rows)
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(many['HX-Trigger'], 'approved-confetti')
+        self.assertContains(many, 'hx-swap-oob="true"', count=12)
+        self.assertEqual(Assignment.objects.filter(status=Assignment.STATUS_APPROVED,
+                                                   approved_by=self.leader).count(), 14)
+        self.assertEqual(reconcile_profile_totals(), [])
+        member = rows[0].assignee
+        member.profile.refresh_from_db()
+        self.assertEqual(member.profile.points_total, 10)
+
+        # Approving again credits nobody twice
+        again, _ = self.bulk('approve', rows)
+        self.assertNotContains(again, 'hx-swap-oob')
+        self.assertEqual(PointsEvent.objects.filter(kind=PointsEvent.KIND_APPROVAL).count(), 14)
+
+    def test_bulk_star_credits_only_approved_work(self):
+        done, waiting = self.submitted(2)
+        done.approve(self.leader)
+        response, _ = self.bulk('star', [done, waiting])
+        self.assertContains(response, 'hx-swap-oob="true"', count=2)
+        done.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual((done.stars_awarded, done.points_awarded), (1, 12))
+        self.assertEqual((waiting.stars_awarded, waiting.points_awarded), (1, 0))
+        self.assertEqual(reconcile_profile_totals(), [])
+
+    def test_members_cannot_bulk_review(self):
+        rows = self.submitted(1)
+        self.client.force_login(rows[0].assignee)
+        response, _ = self.bulk('approve', rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Assignment.objects.filter(status=Assignment.STATUS_APPROVED).exists())
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.member = make_member('member')
+        self.rows = [Assignment.objects.create(task=make_task(self.leader, f'Chore {i}'), assignee=self.member)
+                     for i in range(3)]
+        self.client.force_login(self.leader)
+
+    def lookups(self, fragment, func):
+        counts = metrics.FRAGMENT_CACHE.values
+        before = {r: counts.get((fragment, r), 0) for r in ('hit', 'miss')}
+        response = func()
+        return response, {r: counts.get((fragment, r), 0) - before[r] for r in ('hit', 'miss')}
+
+    def home(self):
+        return self.client.get(reverse('tasksapp:board_section', args=['assigned']))
+
+    def test_cards_rerender_only_when_their_assignment_changes(self):
+        self.home()
+        _, seen = self.lookups('card', self.home)
+        self.assertEqual(seen, {'hit': 3, 'miss': 0})
+
+        self.client.post(reverse('tasksapp:assignment_star', args=[self.rows[0].pk]))
+        response, seen = self.lookups('card', self.home)
+        self.assertEqual(seen, {'hit': 2, 'miss': 1})
+        self.assertContains(response, '⭐ 1')
+
+        task = self.rows[1].task
+        task.title = 'Renamed chore'
+        task.save()
+        response, seen = self.lookups('card', self.home)
+        self.assertEqual(seen, {'hit': 2, 'miss': 1})
+        self.assertContains(response, 'Renamed chore')
+
+        # The assignee sees their own "Mark Complete" button, not the leader's copy
+        self.client.force_login(self.member)
+        response, seen = self.lookups('card', self.home)
+        self.assertEqual(seen['miss'], 3)
+        self.assertContains(response, 'Mark Complete', count=3)
+        self.assertNotContains(response, 'Approve')
+
+    def test_local_fragments_age_out(self):
+        # A queryset update sends no signals, like a write on another worker
+        # whose invalidation never reaches this process-local cache
+        self.home()
+        Task.objects.filter(pk=self.rows[0].task_id).update(title='Renamed elsewhere')
+        self.assertNotContains(self.home(), 'Renamed elsewhere')
+        with override_settings(FRAGMENT_LOCAL_MAX_AGE=0):
+            self.home()
+            self.assertContains(self.home(), 'Renamed elsewhere')
+
+    def test_leaderboard_is_cached_until_points_change(self):
+        url = reverse('tasksapp:leaderboard')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            _, seen = self.lookups('leaderboard', lambda: self.client.get(url))
+        self.assertEqual(seen, {'hit': 1, 'miss': 0})
+        self.assertFalse([q for q in ctx.captured_queries if 'tasksapp_' in q['sql']])
+
+        self.rows[0].approve(self.leader)
+        response, seen = self.lookups('leaderboard', lambda: self.client.get(url))
+        self.assertEqual(seen, {'hit': 0, 'miss': 1})
+        self.assertContains(response, '<td style="text-align:right;">10</td>', html=False)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.member = make_member('member')
+        self.assignment = Assignment.objects.create(task=make_task(self.leader, due_in=timedelta(hours=1)),
+                                                    assignee=self.member)
+        self.client.force_login(self.leader)
+        self.client.get(reverse('tasksapp:home'))  # sets the CSRF cookie, which pages depend on
+
+    def etag(self, name, **extra):
+        response = self.client.get(reverse(name), **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def test_unchanged_pages_answer_304_without_queries(self):
+        for name in ('tasksapp:home', 'tasksapp:my_assignments', 'tasksapp:history', 'tasksapp:leaderboard'):
+            with self.subTest(name):
+                etag = self.etag(name)
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_changes_and_passed_deadlines_give_a_new_etag(self):
+        etag = self.etag('tasksapp:home')
+        self.client.post(reverse('tasksapp:assignment_star', args=[self.assignment.pk]), HTTP_HX_REQUEST='true')
+        response = self.client.get(reverse('tasksapp:home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '⭐ 1')
+
+        # Past the deadline the card moves to Overdue with no write at all
+        etag = response['ETag']
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            response = self.client.get(reverse('tasksapp:home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a.pk for a in response.context['sections'][3]['page']], [self.assignment.pk])
+
+    def test_local_stamps_age_out(self):
+        # A write on another worker (here: one that sends no signals) never
+        # reaches a process-local cache; its stamps must not answer 304 forever
+        etag = self.etag('tasksapp:home')
+        Task.objects.filter(pk=self.assignment.task_id).update(title='Renamed elsewhere')
+        response = self.client.get(reverse('tasksapp:home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with override_settings(FRAGMENT_LOCAL_MAX_AGE=0):
+            response = self.client.get(reverse('tasksapp:home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed elsewhere')
+
+    def test_history_and_leaderboard_follow_their_own_data(self):
+        history, board = self.etag('tasksapp:history'), self.etag('tasksapp:leaderboard')
+        self.assertNotEqual(self.etag('tasksapp:history', HTTP_HX_REQUEST='true'), history)
+        self.assignment.approve(self.leader)
+        self.assertNotEqual(self.etag('tasksapp:history'), history)
+        self.assertNotEqual(self.etag('tasksapp:leaderboard'), board)
+
+    def test_pending_flash_messages_skip_the_etag(self):
+        self.client.post(reverse('tasksapp:assignment_star', args=[self.assignment.pk]))
+        response = self.client.get(reverse('tasksapp:home'))
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'class="flash"')
+
+    def test_cards_refetch_themselves_on_stream_events(self):
+        response = self.client.get(reverse('tasksapp:assignment_card', args=[self.assignment.pk]))
+        self.assertContains(response, f'hx-trigger="sse:a-{self.assignment.pk}"')
+        with self.settings(SSE_ENABLED=True):
+            response = self.client.get(reverse('tasksapp:home'))
+        self.assertContains(response, f'sse-connect="{reverse("core:events")}"')
+        self.assertNotContains(response, 'hx-trigger="every')
+
+    def test_poller_starts_from_the_served_etag(self):
+        response = self.client.get(reverse('tasksapp:home'))
+        self.assertContains(response, 'data-etag="&quot;{}&quot;"'.format(response['ETag'].strip('"')))
+        self.assertContains(response, 'hx-trigger="every 30s"')
+
+
+class TaskImportTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.client.force_login(self.leader)
+
+    def new_task(self, title):
+        due = timezone.now() + timedelta(days=2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('tasksapp:task_new'), {
+                'title': title, 'description': '', 'week_start': monday_of_week(due.date()).isoformat(),
+                'due_at': timezone.localtime(due).strftime('%Y-%m-%dT%H:%M'), 'assign_all': 'on',
+            })
+        return Task.objects.get(title=title), len(ctx.captured_queries)
+
+    def test_assign_to_all_is_bulk(self):
+        User.objects.create(username='pending')  # not approved yet
+        self.client.get(reverse('tasksapp:task_new'))  # warm the session
+        for i in range(3):
+            make_member(f'member{i}')
+        small_task, small = self.new_task('Dishes')
+        for i in range(3, 20):
+            make_member(f'member{i}')
+        large_task, large = self.new_task('Trash')
+        self.assertEqual(small, large)
+        self.assertEqual(large_task.assignments.count(), 21)  # leader + 20 members, not the pending one
+        self.assertFalse(large_task.assignments.exclude(due_at=large_task.due_at).exists())
+
+    def test_csv_upload_is_idempotent(self):
+        make_member('alex')
+        make_member('sam')
+        csv_text = ("title,description,due_at,assignees\n"
+                    "Dishes,After dinner,2026-10-23T18:00,alex sam\n"
+                    "Trash,,2026-10-24T09:00,all\n")
+        for _ in range(2):
+            upload = SimpleUploadedFile('chores.csv', csv_text.encode())
+            response = self.client.post(reverse('tasksapp:task_import'), {'file': upload, 'format': 'auto'})
+            self.assertRedirects(response, reverse('tasksapp:home'))
+        self.assertEqual(Task.objects.count(), 2)
+        dishes = Task.objects.get(title='Dishes')
+        self.assertEqual(sorted(dishes.assignments.values_list('assignee__username', flat=True)), ['alex', 'sam'])
+        self.assertEqual(dishes.week_start, date(2026, 10, 19))
+        self.assertEqual(Task.objects.get(title='Trash').assignments.count(), 3)
+
+    def test_bad_rows_write_nothing(self):
+        upload = SimpleUploadedFile('chores.json', b'[{"title": "Dishes", "due_at": "2026-10-23T18:00", '
+                                                   b'"assignees": ["ghost"]}]')
+        response = self.client.post(reverse('tasksapp:task_import'), {'file': upload, 'format': 'auto'})
+        self.assertContains(response, 'unknown member(s): ghost')
+        self.assertFalse(Task.objects.exists())
+
+    def test_malformed_rows_are_form_errors(self):
+        make_member('alex')
+        cases = [
+            ('chores.json', '[{"title": 42, "due_at": "2026-10-23T18:00"}]', 'row 1: title must be text'),
+            ('chores.json', '[{"title": "Dishes", "description": ["x"], "due_at": "2026-10-23T18:00"}]',
+             'row 1: description must be text'),
+            ('chores.json', '[{"title": "Dishes", "due_at": "2026-10-23T18:00", "assignees": 7}]',
+             'row 1: assignees must be a list'),
+            ('chores.json', '[{"title": "Dishes", "due_at": "2026-10-23T18:00", "assignees": {"alex": 1}}]',
+             'row 1: assignees must be a list'),
+            ('chores.json', '[{"title": "%s", "due_at": "2026-10-23T18:00"}]' % ('x' * 121),
+             'row 1: title is longer than 120 characters'),
+            ('chores.csv', 'title,due_at\n%s,2026-10-23T18:00\n' % ('x' * 140000), 'invalid CSV'),
+            ('chores.csv', 'title,due_at\nDishes,2026-02-30T10:00\n',
+             "row 1: due_at &#x27;2026-02-30T10:00&#x27; is not an ISO date-time"),
+            ('chores.json', '[{"title": "Dishes", "due_at": "2026-10-23T18:00", "week_start": "2026-02-30"}]',
+             "row 1: week_start &#x27;2026-02-30&#x27; is not a date"),
+        ]
+        for name, body, error in cases:
+            with self.subTest(error=error):
+                upload = SimpleUploadedFile(name, body.encode())
+                response = self.client.post(reverse('tasksapp:task_import'), {'file': upload, 'format': 'auto'})
+                self.assertContains(response, error)
+        self.assertFalse(Task.objects.exists())
+
+    def test_command_imports_json(self):
+        make_member('alex')
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+            json.dump([{'title': 'Laundry', 'due_at': '2026-10-25T12:00', 'assignees': 'all'}], fh)
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command('import_tasks', fh.name, created_by='leader', stdout=out)
+        self.assertIn('1 new task(s), 2 new assignment(s)', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+
+class OverdueSweepTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.alice = make_member('alice')
+        self.bob = make_member('bob')
+
+    def overdue(self, user, title):
+        return Assignment.objects.create(task=make_task(self.leader, title, due_in=-timedelta(hours=1)),
+                                         assignee=user)
+
+    def test_sweep_penalizes_each_overdue_assignment_once(self):
+        late1 = self.overdue(self.alice, 'A1')
+        self.overdue(self.alice, 'A2')
+        self.overdue(self.bob, 'B1')
+        Assignment.objects.create(task=make_task(self.leader, 'Future'), assignee=self.bob)
+        done = self.overdue(self.bob, 'B2')
+        done.approve(self.leader)
+
+        self.assertEqual(sweep_overdue(batch_size=2), 3)
+        self.assertEqual(sweep_overdue(), 0)
+
+        self.alice.profile.refresh_from_db()
+        self.bob.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.points_total, -20)
+        self.assertEqual(self.bob.profile.points_total, 10 - 10)
+        late1.refresh_from_db()
+        self.assertTrue(late1.late_penalized)
+        self.assertFalse(late1.apply_late_penalty_once())
+
+    def test_home_is_read_only(self):
+        self.overdue(self.alice, 'A1')
+        self.client.force_login(self.alice)
+        self.client.get(reverse('tasksapp:home'))  # warm the session
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('tasksapp:home'))
+        writes = [q['sql'] for q in ctx.captured_queries
+                  if q['sql'].startswith(('UPDATE', 'INSERT')) and 'django_session' not in q['sql']]
+        self.assertEqual(writes, [])
+
+    def test_submit_after_deadline_penalizes_once(self):
+        a = self.overdue(self.alice, 'A1')
+        self.client.force_login(self.alice)
+        url = reverse('tasksapp:assignment_submit', args=[a.pk])
+        self.client.post(url)
+        self.client.post(url)
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.points_total, -10)
+
+
+class RolloverTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.alice = make_member('alice')
+        self.bob = make_member('bob')
+        self.task = make_task(self.leader, 'Dishes', due_in=-timedelta(hours=1))
+        self.late_a = Assignment.objects.create(task=self.task, assignee=self.alice)
+        self.late_b = Assignment.objects.create(task=self.task, assignee=self.bob)
+
+    def test_rollover_is_idempotent(self):
+        stats = rollover(chunk_size=1)
+        self.assertEqual((stats['rolled'], stats['tasks_created'], stats['assignments_created'], stats['penalized']),
+                         (2, 1, 2, 2))
+        self.assertEqual(rollover(), {})
+
+        next_task = Task.objects.get(title='Dishes', week_start=self.task.week_start + timedelta(days=7))
+        self.assertEqual(next_task.due_at, self.task.due_at + timedelta(days=7))
+        rolled = Assignment.objects.get(rolled_from=self.late_a)
+        self.assertEqual((rolled.task, rolled.due_at), (next_task, next_task.due_at))
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.points_total, -10)
+
+    def test_long_overdue_rows_roll_once_into_an_open_week(self):
+        old = make_task(self.leader, 'Trash', due_in=-timedelta(weeks=5))
+        late = Assignment.objects.create(task=old, assignee=self.alice)
+        stats = rollover(chunk_size=1)
+        self.assertEqual((stats['rolled'], stats['assignments_created'], stats['penalized']), (3, 3, 3))
+        rolled = Assignment.objects.get(rolled_from=late)
+        self.assertEqual(rolled.task.week_start, old.week_start + timedelta(weeks=6))
+        self.assertGreater(rolled.due_at, timezone.now())
+        self.assertIsNone(rolled.rolled_at)
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.points_total, -20)
+
+    def test_rows_already_penalized_by_the_sweeper_are_not_penalized_again(self):
+        sweep_overdue()
+        stats = rollover()
+        self.assertEqual((stats['rolled'], stats['penalized']), (2, 0))
+        self.bob.profile.refresh_from_db()
+        self.assertEqual(self.bob.profile.points_total, -10)
+
+    def test_dry_run_writes_nothing(self):
+        stats = rollover(dry_run=True)
+        self.assertEqual((stats['rolled'], stats['penalized']), (2, 2))
+        self.assertEqual(Assignment.objects.filter(rolled_at__isnull=False).count(), 0)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(PointsEvent.objects.count(), 0)
+
+
+class PointsLedgerTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.alice = make_member('alice')
+
+    def totals(self, user):
+        user.profile.refresh_from_db()
+        return user.profile.points_total, user.profile.stars_total
+
+    def test_approve_and_star_write_ledger_and_totals(self):
+        a = Assignment.objects.create(task=make_task(self.leader), assignee=self.alice)
+        a.award_star(self.leader)
+        self.assertTrue(a.approve(self.leader))
+        self.assertFalse(a.approve(self.leader))
+        a.award_star(self.leader)
+
+        self.assertEqual(self.totals(self.alice), (10 + 2 + 2, 2))
+        a.refresh_from_db()
+        self.assertEqual((a.stars_awarded, a.points_awarded), (2, 14))
+        kinds = list(PointsEvent.objects.filter(user=self.alice).order_by('pk').values_list('kind', 'points', 'stars'))
+        self.assertEqual(kinds, [(PointsEvent.KIND_APPROVAL, 12, 1), (PointsEvent.KIND_STAR, 2, 1)])
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        a = Assignment.objects.create(task=make_task(self.leader), assignee=self.alice)
+        a.approve(self.leader)
+        self.assertEqual(reconcile_profile_totals(chunk_size=1), [])
+
+        self.alice.profile.points_total = 99
+        self.alice.profile.save()
+        drift = reconcile_profile_totals(chunk_size=1, fix=True)
+        self.assertEqual([(d['user_id'], d['points_total'], d['ledger_points']) for d in drift],
+                         [(self.alice.id, 99, 10)])
+        self.assertEqual(self.totals(self.alice), (10, 0))
+
+    def test_member_edit_records_adjustment(self):
+        self.client.force_login(self.leader)
+        self.client.post(reverse('core:member_edit', args=[self.alice.id]), {
+            'username': 'alice', 'email': '', 'first_name': '', 'last_name': '', 'is_active': 'on',
+            'display_name': 'Alice', 'is_approved': 'on', 'points_total': 5, 'stars_total': 1,
+        })
+        self.assertEqual(self.totals(self.alice), (5, 1))
+        event = PointsEvent.objects.get(user=self.alice)
+        self.assertEqual((event.kind, event.points, event.stars), (PointsEvent.KIND_ADJUSTMENT, 5, 1))
+
+
+class HistoryKeysetTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        now = timezone.now()
+        for i in range(23):
+            a = Assignment.objects.create(task=make_task(self.leader, f'T{i}'), assignee=self.leader)
+            # Mix of approved, submitted and assigned rows, with ties on approved_at
+            if i % 3 == 0:
+                Assignment.objects.filter(pk=a.pk).update(status=Assignment.STATUS_APPROVED,
+                                                          approved_at=now - timedelta(hours=i // 6),
+                                                          submitted_at=now - timedelta(hours=i))
+            elif i % 3 == 1:
+                Assignment.objects.filter(pk=a.pk).update(status=Assignment.STATUS_SUBMITTED,
+                                                          submitted_at=now - timedelta(minutes=i))
+        self.expected = [a.pk for a in Assignment.objects.order_by(
+            F('approved_at').desc(nulls_last=True), F('submitted_at').desc(nulls_last=True),
+            '-created_at', '-id')]
+
+    def test_cursors_walk_forward_and_back_in_history_order(self):
+        paginator = KeysetPaginator(Assignment.objects.all(), HISTORY_ORDERING, per_page=5)
+        seen, pages, page = [], [], paginator.page()
+        while True:
+            pages.append(page)
+            seen += [a.pk for a in page]
+            if not page.has_next:
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([a.pk for a in back], [a.pk for a in pages[-2]])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Assignment.objects.all(), HISTORY_ORDERING, per_page=5)
+        self.assertEqual([a.pk for a in paginator.page('garbage')], self.expected[:5])
+
+    def test_older_link_only_without_load_more(self):
+        self.client.force_login(self.leader)
+        with mock.patch('tasksapp.views.HISTORY_PAGE_SIZE', 5):
+            html = self.client.get(reverse('tasksapp:history')).content.decode()
+        self.assertIn('Load more', html)
+        older = re.search(r'<noscript>\s*<a [^>]*>Older', html)
+        self.assertIsNotNone(older)
+        self.assertEqual(html.count('Older &raquo;'), 1)  # only the no-JS fallback
+
+    def test_deep_page_costs_the_same_as_first(self):
+        task = make_task(self.leader, 'Bulk')
+        Assignment.objects.bulk_create([Assignment(task=task, assignee=make_member(f'm{i}')) for i in range(30)])
+        self.client.force_login(self.leader)
+        url = reverse('tasksapp:history')
+        self.client.get(url)  # warm the session
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(url, {'cursor': cursor}, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'tasksapp/_history_rows.html')
+        self.assertNotIn('COUNT(', ' '.join(q['sql'] for q in second.captured_queries))
+        self.assertLessEqual(len(second.captured_queries), len(first.captured_queries) + 1)
+
+
+class WeeklyScoreTests(TestCase):
+    def setUp(self):
+        self.leader = make_member('leader', is_staff=True)
+        self.alice = make_member('alice')
+        self.bob = make_member('bob')
+
+    def test_rollup_tracks_approvals_stars_and_penalties(self):
+        a = Assignment.objects.create(task=make_task(self.leader, 'A'), assignee=self.alice)
+        a.approve(self.leader)
+        a.award_star(self.leader)
+        week = a.task.week_start
+        late_task = make_task(self.leader, 'B', due_in=-timedelta(hours=1))
+        Task.objects.filter(pk=late_task.pk).update(week_start=week - timedelta(days=7))
+        Assignment.objects.create(task=late_task, assignee=self.alice)
+        sweep_overdue()
+
+        score = WeeklyScore.objects.get(user=self.alice, week_start=week)
+        self.assertEqual((score.points, score.stars, score.approvals), (12, 1, 1))
+        late = WeeklyScore.objects.get(user=self.alice, week_start=week - timedelta(days=7))
+        self.assertEqual((late.points, late.approvals), (-10, 0))
+
+        live = list(WeeklyScore.objects.order_by('user_id', 'week_start').values_list(
+            'user_id', 'week_start', 'points', 'stars', 'approvals'))
+        rebuild_weekly_scores()
+        rebuilt = list(WeeklyScore.objects.order_by('user_id', 'week_start').values_list(
+            'user_id', 'week_start', 'points', 'stars', 'approvals'))
+        self.assertEqual(live, rebuilt)
+
+    def test_weekly_view_reads_rollup(self):
+        a = Assignment.objects.create(task=make_task(self.leader, 'A'), assignee=self.bob)
+        a.approve(self.leader)
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('tasksapp:weekly'), {'week': a.task.week_start.isoformat()})
+        self.assertEqual([(r.user, r.points) for r in response.context['rows']], [(self.bob, 10)])
+
+    def test_out_of_range_weeks_fall_back_to_this_week(self):
+        self.client.force_login(self.alice)
+        this_week = monday_of_week(date.today())
+        for week in ('0001-01-01', '0001-01-05', '9999-12-31', '1999-12-27', 'nope'):
+            response = self.client.get(reverse('tasksapp:weekly'), {'week': week})
+            self.assertEqual(response.context['week_start'], this_week, week)
+        floor = self.client.get(reverse('tasksapp:weekly'), {'week': '2000-01-05'})
+        self.assertEqual(floor.context['week_start'], date(2000, 1, 3))
+        self.assertIsNone(floor.context['prev_week'])
+        section = self.client.get(reverse('tasksapp:board_section', args=['approved']), {'week': '0001-01-01'})
+        self.assertEqual(section.status_code, 200)
@@ -6,9 +6,18 @@ app_name = 'tasksapp'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('board/<str:section>/', views.board_section, name='board_section'),
+    path('my/', views.my_assignments, name='my_assignments'),
+    path('my/<str:section>/', views.board_section, {'mine': True}, name='my_section'),
+    path('review/', views.review, name='review'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
     path('task/new/', views.task_new, name='task_new'),
+    path('task/import/', views.task_import, name='task_import'),
     path('assignment/<int:pk>/submit/', views.assignment_submit, name='assignment_submit'),
     path('assignment/<int:pk>/approve/', views.assignment_approve, name='assignment_approve'),
+    path('assignment/bulk/', views.assignment_bulk, name='assignment_bulk'),
     path('assignment/<int:pk>/star/', views.assignment_star, name='assignment_star'),
+    path('assignment/<int:pk>/card/', views.assignment_card, name='assignment_card'),
     path('history/', views.history, name='history'),
+    path('weekly/', views.weekly, name='weekly'),
 ]
@@ -3,20 +3,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.db import transaction
-from django.core.paginator import Paginator
 from datetime import date, timedelta
+from core import fragments
+from core.middleware import query_budget
 from core.models import SiteSetting
 from .models import Task, Assignment, monday_of_week
-from .forms import TaskForm
+from .pagination import KeysetPaginator
+from .review import approve_assignments, star_assignments
+from .selectors import (BOARD_ORDERING, LEADERBOARD_ORDERING, REVIEW_ORDERING, board_cards, card_queryset,
+                        leaderboard_queryset, leaderboard_rows, next_deadline, review_queue, weekly_scores,
+                        weekly_top)
+from .forms import TaskForm, TaskImportForm
+from .imports import (TaskImportError, approved_member_ids, create_assignments, detect_format, import_tasks,
+                      parse_tasks)
 
+import time
 from functools import wraps
 
 def is_leader(user):
-    return SiteSetting.get_solo().current_leader_id == user.id or user.is_superuser or user.is_staff
+    return SiteSetting.get_cached().current_leader_id == user.id or user.is_superuser or user.is_staff
 
 # Require that the logged-in user's profile is approved; otherwise redirect to pending
 def approved_required(view_func):
@@ -29,123 +43,204 @@ def approved_required(view_func):
         return view_func(request, *args, **kwargs)
     return _wrapped
 
+# Data versions (core.fragments tags) behind the board and history pages
+BOARD_TAGS = ['assignments', 'members', 'site']
+
+def _next_deadline(now):
+    # Cached per assignments version; recomputed once it has passed
+    return fragments.get_or_set('next-deadline', ['assignments'], [], lambda: next_deadline(now),
+                                valid=lambda deadline: deadline is None or deadline > now)
+
+def _page_etag(request, tags, *vary):
+    """
+    ETag for a full page: the data versions plus everything else the HTML
+    depends on (viewer, CSRF secret, URL, week, deadlines passed). None while
+    flash messages are waiting, so they are always rendered.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    return fragments.digest(tags, [request.user.pk, is_leader(request.user), request.META.get('CSRF_COOKIE'),
+                                   request.get_full_path(), monday_of_week(date.today()),
+                                   _next_deadline(timezone.now()), *vary])
+
+def _board_etag(request, *args, **kwargs):
+    return _page_etag(request, BOARD_TAGS)
+
+def _history_etag(request):
+    return _page_etag(request, BOARD_TAGS, request.headers.get('HX-Request'))
+
+def _leaderboard_etag(request):
+    return fragments.digest(['leaderboard'], [request.get_full_path(), monday_of_week(date.today())])
+
+def revalidated(etag_func):
+    """
+    Conditional GET: answer If-None-Match with 304 before the view runs. The
+    browser may keep a private copy but must revalidate it on every load.
+    """
+    def decorator(view_func):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag_func)(view_func))
+    return decorator
+
+BOARD_SECTIONS = {
+    'assigned': 'Assigned',
+    'submitted': 'Submitted (Awaiting Approval)',
+    'approved': 'Done',
+    'overdue': 'Incompleted Tasks',
+}
+MY_SECTIONS = {
+    'overdue': 'Overdue',
+    'assigned': 'To do',
+    'submitted': 'Waiting for approval',
+    'approved': 'Done',
+}
+BOARD_PAGE_SIZE = 10
+LEADERBOARD_PAGE_SIZE = 25
+
+EARLIEST_WEEK = date(2000, 1, 3)  # a Monday; older ?week= values are not real club weeks
+WEEKS_AHEAD = 52  # tasks may be planned for later weeks, but not further out than this
+
+def _requested_week(request):
+    """
+    Monday of the ?week= date, or of the current week when missing, invalid or
+    out of range (which also keeps the week arithmetic away from date.min/max).
+    """
+    this_week = monday_of_week(date.today())
+    try:
+        week_start = monday_of_week(date.fromisoformat(request.GET.get('week', '')))
+    except ValueError:
+        return this_week
+    if not EARLIEST_WEEK <= week_start <= this_week + timedelta(weeks=WEEKS_AHEAD):
+        return this_week
+    return week_start
+
+def _board_page(section, now, week_start, cursor=None, assignee=None):
+    paginator = KeysetPaginator(board_cards(section, now, week_start, assignee), BOARD_ORDERING[section],
+                                per_page=BOARD_PAGE_SIZE)
+    return paginator.page(cursor)
+
+def _board_sections(titles, url_name, now, week_start, assignee=None):
+    """First page of every section, with the fragment URL that serves the rest."""
+    return [{'name': name, 'title': title, 'url': reverse(url_name, args=[name]),
+             'page': _board_page(name, now, week_start, assignee=assignee)}
+            for name, title in titles.items()]
+
+def _week_nav(week_start):
+    this_week = monday_of_week(date.today())
+    return {
+        'week_start': week_start,
+        'prev_week': week_start - timedelta(days=7) if week_start > EARLIEST_WEEK else None,
+        'next_week': week_start + timedelta(days=7) if week_start < this_week else None,
+    }
+
+def _poll(request):
+    """
+    Context for live boards: with SSE_ENABLED cards follow the event stream,
+    otherwise _board_poll.html polls with the ETag the page was served with.
+    """
+    if settings.SSE_ENABLED:
+        return {'sse': True, 'poll_interval': 0}
+    etag = _board_etag(request)
+    return {'sse': False, 'poll_interval': settings.BOARD_POLL_INTERVAL, 'etag': quote_etag(etag) if etag else ''}
+
+@query_budget(5)  # 4 sections, plus the ETag's next-deadline lookup after a change
 @login_required
 @approved_required
+@revalidated(_board_etag)
 def home(request):
-    from django.db.models import Q
-
-    now = timezone.now()
+    # Only the first page of each section; later pages and the leaderboards
+    # are fetched by the board_section and leaderboard fragments
+    week_start = monday_of_week(date.today())
+    return render(request, 'tasksapp/home.html', {
+        'sections': _board_sections(BOARD_SECTIONS, 'tasksapp:board_section', timezone.now(), week_start),
+        'is_leader': is_leader(request.user),
+        **_week_nav(week_start),
+        **_poll(request),
+    })
 
-    # Use DB-level querysets (faster than slicing a Python list)
-    base_qs = (Assignment.objects
-               .select_related('task', 'assignee', 'assignee__profile')
-               .order_by('-task__week_start', 'task__due_at'))
-
-    assigned = list(base_qs.filter(status=Assignment.STATUS_ASSIGNED))
-    submitted = list(base_qs.filter(status=Assignment.STATUS_SUBMITTED))
-    approved = list(base_qs.filter(status=Assignment.STATUS_APPROVED))
-
-    # Overdue = due time passed and not approved
-    overdue = list(base_qs.filter(task__due_at__lt=now).exclude(status=Assignment.STATUS_APPROVED))
-
-    # Apply -10 once for each freshly overdue assignment
-    for a in overdue:
-        if hasattr(a, 'late_penalized') and not a.late_penalized:
-            prof = a.assignee.profile
-            prof.points_total = (prof.points_total or 0) - 10
-            prof.save(update_fields=['points_total'])
-            a.late_penalized = True
-            a.save(update_fields=['late_penalized'])
-
-    # Weekly leaderboard (Mon–Sun)
-    today = date.today()
-    week_start = monday_of_week(today)
-
-    weekly_points = {}
-    weekly_stars = {}
-    week_approved = [a for a in approved if a.task.week_start == week_start]
-    for a in week_approved:
-        weekly_points[a.assignee_id] = weekly_points.get(a.assignee_id, 0) + (a.points_awarded or 0)
-        weekly_stars[a.assignee_id] = weekly_stars.get(a.assignee_id, 0) + (a.stars_awarded or 0)
-
-    top_points = sorted(weekly_points.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_stars = sorted(weekly_stars.items(), key=lambda x: x[1], reverse=True)[:5]
-
-    # Fetch involved users in one query
-    user_ids = {uid for uid, _ in (top_points + top_stars)}
-    users_map = {u.id: u for u in User.objects.filter(id__in=user_ids)}
-    top_points = [(users_map.get(uid), pts) for uid, pts in top_points]
-    top_stars = [(users_map.get(uid), st) for uid, st in top_stars]
-
-    # ---- Full leaderboard (all members with last activity) ----
-    users_all = (User.objects
-                 .filter(is_active=True)
-                 .select_related('profile')
-                 .order_by('-profile__points_total', 'username'))
-
-    leaderboard_all = []
-    for u in users_all:
-        last_task_title = None
-        last_points = 0
-        last_when = None
-        last_status = None
-
-        # Prefer most recent APPROVED (points_awarded is meaningful)
-        last = (Assignment.objects
-                .filter(assignee=u, status=Assignment.STATUS_APPROVED)
-                .select_related('task')
-                .order_by('-approved_at')
-                .first())
-        if last:
-            last_status = 'approved'
-            last_when = last.approved_at
-            last_points = last.points_awarded or 0
-            last_task_title = last.task.title if last.task_id else None
-        else:
-            # Fall back to most recent SUBMITTED
-            last = (Assignment.objects
-                    .filter(assignee=u, status=Assignment.STATUS_SUBMITTED)
-                    .select_related('task')
-                    .order_by('-submitted_at')
-                    .first())
-            if last:
-                last_status = 'submitted'
-                last_when = last.submitted_at
-                last_task_title = last.task.title if last.task_id else None
-            else:
-                # Finally, most recent ASSIGNED (by due_at then id)
-                last = (Assignment.objects
-                        .filter(assignee=u, status=Assignment.STATUS_ASSIGNED)
-                        .select_related('task')
-                        .order_by('-task__due_at', '-id')
-                        .first())
-                if last:
-                    last_status = 'assigned'
-                    last_when = last.task.due_at
-                    last_task_title = last.task.title if last.task_id else None
-
-        leaderboard_all.append({
-            'user': u,
-            'points_total': getattr(getattr(u, 'profile', None), 'points_total', 0) or 0,
-            'last_task_title': last_task_title,
-            'last_points': last_points,
-            'last_when': last_when,
-            'last_status': last_status,
-        })
+@query_budget(5)
+@login_required
+@approved_required
+@revalidated(_board_etag)
+def my_assignments(request):
+    """The signed-in member's own work, grouped by status and due date."""
+    week_start = monday_of_week(date.today())
+    return render(request, 'tasksapp/my.html', {
+        'sections': _board_sections(MY_SECTIONS, 'tasksapp:my_section', timezone.now(), week_start,
+                                    assignee=request.user),
+        'is_leader': is_leader(request.user),
+        **_week_nav(week_start),
+        **_poll(request),
+    })
 
-    return render(request, 'tasksapp/home.html', {
-        'assigned': assigned,
-        'submitted': submitted,
-        'approved': approved,
-        'overdue': overdue,
+@query_budget(1)
+@login_required
+@approved_required
+@revalidated(_board_etag)
+def board_section(request, section, mine=False):
+    """
+    One page of a board section (HTMX infinite scroll / approved week picker);
+    with mine=True only the signed-in member's cards.
+    """
+    if section not in BOARD_SECTIONS:
+        raise Http404("Unknown section.")
+    week_start = _requested_week(request)
+    cursor = request.GET.get('cursor')
+    return render(request, 'tasksapp/_board_page.html', {
+        'page_obj': _board_page(section, timezone.now(), week_start, cursor,
+                                assignee=request.user if mine else None),
+        'section': section,
+        'section_url': request.path,
+        'group_by_day': mine,
         'is_leader': is_leader(request.user),
-        'top_points': top_points,
-        'top_stars': top_stars,
-        'leaderboard_all': leaderboard_all,
-        'week_start': week_start,
-        'now': now,
+        **_week_nav(week_start),
     })
 
+REVIEW_PAGE_SIZE = 20
+
+@query_budget(1)
+@login_required
+@approved_required
+def review(request):
+    """Leader's queue of submitted work, longest-waiting first."""
+    if not is_leader(request.user):
+        messages.error(request, 'Only leader/admin can review submissions.')
+        return redirect('tasksapp:home')
+    page = KeysetPaginator(review_queue(), REVIEW_ORDERING, per_page=REVIEW_PAGE_SIZE) \
+        .page(request.GET.get('cursor'))
+    template = 'tasksapp/_board_page.html' if request.headers.get('HX-Request') else 'tasksapp/review.html'
+    return render(request, template, {
+        'page_obj': page,
+        'section': 'review',
+        'section_url': request.path,
+        'is_leader': True,
+        'selectable': True,
+    })
+
+@query_budget(3)
+@login_required
+@approved_required
+@revalidated(_leaderboard_etag)
+def leaderboard(request):
+    """
+    This week's top members plus the paginated all-members leaderboard, loaded
+    lazily. Each page is served from the fragment cache until a points event
+    or member change invalidates the 'leaderboard' tag.
+    """
+    cursor = request.GET.get('cursor')
+    week_start = monday_of_week(date.today())
+
+    def render_page():
+        page = KeysetPaginator(leaderboard_queryset(), LEADERBOARD_ORDERING, per_page=LEADERBOARD_PAGE_SIZE) \
+            .page(cursor)
+        context = {'page_obj': page, 'leaderboard_all': leaderboard_rows(page.object_list)}
+        if cursor:
+            return render_to_string('tasksapp/_leaderboard_rows.html', context, request)
+        context['top_points'], context['top_stars'] = weekly_top(week_start)
+        context['week_start'] = week_start
+        return render_to_string('tasksapp/_leaderboard.html', context, request)
+
+    return HttpResponse(fragments.get_or_set('leaderboard', ['leaderboard'], [cursor, week_start], render_page))
+
 @login_required
 @approved_required
 def task_new(request):
@@ -159,18 +254,44 @@ def task_new(request):
             task = form.save(commit=False)
             task.created_by = request.user
             task.save()
-            for u in assignees:
-                Assignment.objects.get_or_create(task=task, assignee=u)
-            messages.success(request, 'Task created and assigned.')
+            user_ids = approved_member_ids() if form.cleaned_data['assign_all'] else [u.pk for u in assignees]
+            created = create_assignments([(task, uid) for uid in user_ids])
+            messages.success(request, f'Task created and assigned to {created} member(s).')
             return redirect('tasksapp:home')
     else:
         # Defaults: current week Monday
-        from datetime import date
-        from .models import monday_of_week
         initial = {'week_start': monday_of_week(date.today())}
         form = TaskForm(initial=initial)
     return render(request, 'tasksapp/task_form.html', {'form': form})
 
+@login_required
+@approved_required
+def task_import(request):
+    """Create tasks and their assignments from an uploaded CSV or JSON file."""
+    if not is_leader(request.user):
+        messages.error(request, 'Only leader/admin can import tasks.')
+        return redirect('tasksapp:home')
+    form = TaskImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            data = upload.read().decode('utf-8-sig')
+            fmt = form.cleaned_data['format']
+            started = time.monotonic()
+            stats = import_tasks(parse_tasks(data, detect_format(upload.name, data) if fmt == 'auto' else fmt),
+                                 created_by=request.user)
+        except (UnicodeDecodeError, TaskImportError) as exc:
+            form.add_error('file', str(exc))
+        else:
+            elapsed = time.monotonic() - started
+            messages.success(request, (
+                f"Imported {stats['rows']} row(s): {stats['tasks_created']} new task(s), "
+                f"{stats['assignments_created']} new assignment(s) in {elapsed:.2f}s "
+                f"({stats['rows'] / elapsed if elapsed else 0:.0f} rows/s)."))
+            return redirect('tasksapp:home')
+    return render(request, 'tasksapp/task_import.html', {'form': form})
+
+@query_budget(4)
 @login_required
 @approved_required
 @transaction.atomic
@@ -179,15 +300,9 @@ def assignment_submit(request, pk):
     if a.status != Assignment.STATUS_ASSIGNED:
         return HttpResponseBadRequest("Invalid state.")
 
-    now = timezone.now()
-    # Block submissions after deadline; apply -10 once if available
-    if a.task.due_at and now > a.task.due_at:
-        if hasattr(a, 'late_penalized') and not a.late_penalized:
-            p = a.assignee.profile
-            p.points_total = (p.points_total or 0) - 10
-            p.save(update_fields=['points_total'])
-            a.late_penalized = True
-            a.save(update_fields=['late_penalized'])
+    # Block submissions after deadline; apply -10 once if not yet penalized
+    if a.is_overdue():
+        a.apply_late_penalty_once()
         # Return updated card for HTMX or flash + redirect otherwise
         if request.headers.get('HX-Request'):
             html = render_to_string('tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)}, request=request)
@@ -203,58 +318,103 @@ def assignment_submit(request, pk):
     messages.success(request, 'Marked complete; awaiting approval.')
     return redirect('tasksapp:home')
 
+@query_budget(7)
 @login_required
 @approved_required
 def assignment_approve(request, pk):
-    a = get_object_or_404(Assignment, pk=pk)
+    a = get_object_or_404(Assignment.objects.select_related('task', 'assignee'), pk=pk)
     if not is_leader(request.user):
         return HttpResponseBadRequest("Only leader/admin can approve.")
     if a.status not in [Assignment.STATUS_SUBMITTED, Assignment.STATUS_ASSIGNED]:
         return HttpResponseBadRequest("Invalid state.")
-    a.approve(request.user)
-    # Record approver and ensure approved_at exists for history
-    a.approved_by = request.user
-    if not a.approved_at:
-        a.approved_at = timezone.now()
-    a.save(update_fields=["approved_by", "approved_at"])
+    if not a.approve(request.user):
+        return HttpResponseBadRequest("Already approved.")
     if request.headers.get('HX-Request'):
-        html = render_to_string('tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)})
+        html = render_to_string('tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)}, request=request)
         # Fire confetti on the client
         return HttpResponse(html, headers={'HX-Trigger': 'approved-confetti'})
     messages.success(request, 'Approved! 🎉')
     return redirect('tasksapp:home')
 
+BULK_ACTIONS = {
+    # action -> (service, HX-Trigger event, flash message)
+    'approve': (approve_assignments, 'approved-confetti', 'Approved {n} assignment(s)! 🎉'),
+    'star': (star_assignments, 'star-awarded', 'Starred {n} assignment(s).'),
+}
+
+@query_budget(9)
+@login_required
+@approved_required
+def assignment_bulk(request):
+    """Approve or star every selected card of the review queue in one transaction."""
+    if request.method != 'POST':
+        return HttpResponseBadRequest("POST only.")
+    if not is_leader(request.user):
+        return HttpResponseBadRequest("Only leader/admin can review.")
+    if request.POST.get('action') not in BULK_ACTIONS:
+        return HttpResponseBadRequest("Unknown action.")
+    service, trigger, message = BULK_ACTIONS[request.POST['action']]
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    done = service(ids, request.user) if ids else []
+    if request.headers.get('HX-Request'):
+        # Every affected card swaps itself in place (hx-swap-oob)
+        cards = card_queryset().filter(pk__in=done).order_by('pk')
+        response = render(request, 'tasksapp/_cards_oob.html', {'cards': cards, 'is_leader': True,
+                                                                'selectable': True})
+        if done:
+            response['HX-Trigger'] = trigger
+        return response
+    messages.success(request, message.format(n=len(done)))
+    return redirect('tasksapp:review')
+
+@query_budget(5)
 @login_required
 @approved_required
 def assignment_star(request, pk):
     a = get_object_or_404(Assignment, pk=pk)
     if not is_leader(request.user):
         return HttpResponseBadRequest("Only leader/admin can star.")
-    a.award_star()
-    # If already approved, reflect +2 extra points
-    if a.status == Assignment.STATUS_APPROVED:
-        p = a.assignee.profile
-        p.stars_total += 1
-        p.points_total += 2
-        a.points_awarded += 2
-        a.save()
-        p.save()
+    # Stars on approved work also credit +2 immediately
+    a.award_star(request.user)
     if request.headers.get('HX-Request'):
-        html = render_to_string('tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)})
+        html = render_to_string('tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)}, request=request)
         return HttpResponse(html, headers={'HX-Trigger': 'star-awarded'})
     messages.success(request, 'Star added.')
     return redirect('tasksapp:home')
 
+@query_budget(1)
+@login_required
+@approved_required
+def assignment_card(request, pk):
+    """One card, as this viewer sees it; cards re-fetch themselves on live update events."""
+    a = get_object_or_404(card_queryset(), pk=pk)
+    return render(request, 'tasksapp/_card.html', {'a': a, 'is_leader': is_leader(request.user)})
+
+@query_budget(1)
+@login_required
+@approved_required
+def weekly(request):
+    """Leaderboard for any past or current week, read from the WeeklyScore rollup."""
+    week_start = _requested_week(request)
+    return render(request, 'tasksapp/weekly.html', {
+        'rows': weekly_scores(week_start),
+        **_week_nav(week_start),
+    })
+
+HISTORY_ORDERING = ['-approved_at', '-submitted_at', '-created_at', '-id']
+HISTORY_PAGE_SIZE = 25
+
+@query_budget(1)
 @login_required
 @approved_required
+@revalidated(_history_etag)
 def history(request):
     now = timezone.now()
-    qs = (Assignment.objects
-          .select_related('task', 'assignee', 'approved_by')
-          .order_by('-approved_at', '-submitted_at', '-created_at', '-id'))
+    qs = Assignment.objects.select_related('task', 'assignee', 'approved_by')
 
-    paginator = Paginator(qs, 25)
-    page = paginator.get_page(request.GET.get('page'))
+    # Keyset pagination: opaque cursors instead of page numbers (no COUNT/OFFSET)
+    paginator = KeysetPaginator(qs, HISTORY_ORDERING, per_page=HISTORY_PAGE_SIZE)
+    page = paginator.page(request.GET.get('cursor'))
 
     # Compute display status for current page items
     for a in page.object_list:
@@ -268,6 +428,8 @@ def history(request):
         else:
             a.display_status = 'Assigned'
 
-    return render(request, 'tasksapp/history.html', {
+    # HTMX "load more" appends just the next rows
+    template = 'tasksapp/_history_rows.html' if request.headers.get('HX-Request') else 'tasksapp/history.html'
+    return render(request, template, {
         'page_obj': page,
     })